@@ -1,15 +1,4 @@
 #!/bin/bash
 
-projects=(
-    "notpixel"
-)
-current_project=""
-
-
-while true
-do
-    for project in "${projects[@]}"; do
-        current_project=$project
-        poetry run python -m scripts.$project.claimer >> scripts/$project/claimer/log.txt 2>&1
-    done
-done
+# Logs are written and rotated by the supervisor, see "logging" in supervisor.json
+poetry run python -m src.forgery supervise supervisor.json > /dev/null 2>> crash.txt
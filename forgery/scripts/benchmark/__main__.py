@@ -0,0 +1,129 @@
+import os
+import json
+import asyncio
+import importlib
+from time import perf_counter
+from typing import Any
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from playwright.async_api import BrowserContext
+from src.forgery.automation import execute_chromium
+from src.forgery.resources import tree_rss
+from scripts.notpixel import canvas
+from scripts.benchmark.standin import StandIn
+
+
+parser = ArgumentParser(
+    "benchmark",
+    "runs a script against a local stand-in of the sites it uses"
+)
+parser.add_argument(
+    "-s", "--script",
+    type=str,
+    default="scripts.notpixel.claimer",
+    help="module of the script to run"
+)
+parser.add_argument(
+    "-p", "--profiles",
+    type=int,
+    default=10,
+    help="number of throwaway profiles"
+)
+parser.add_argument(
+    "-t", "--threads",
+    type=int,
+    default=2
+)
+parser.add_argument(
+    "-e", "--energy",
+    type=int,
+    default=5,
+    help="energy every profile starts with"
+)
+parser.add_argument(
+    "--headed",
+    action="store_true"
+)
+
+args = parser.parse_args()
+
+
+async def sample_rss(
+    peak: list[int],
+    interval: float = 0.2
+) -> None:
+    while True:
+        peak[0] = max(peak[0], tree_rss())
+        await asyncio.sleep(interval)
+
+
+async def main() -> None:
+    standin = StandIn(energy=args.energy)
+    base = standin.start()
+    with TemporaryDirectory() as directory:
+        profiles = os.path.join(directory, "profiles.json")
+        with open(profiles, "w") as f:
+            json.dump(
+                [
+                    {"id": f"benchmark-{i}"}
+                    for i in range(args.profiles)
+                ],
+                f
+            )
+        # API requests of page.request bypass context routes
+        canvas.CANVAS_URL = f"{base}/image"
+        canvas.TEMPLATE_URL = f"{base}/templates/{{}}.png"
+        canvas.TEMPLATE_DIR = os.path.join(directory, "templates")
+        canvas.replica.path = os.path.join(directory, "canvas.npy")
+        module = importlib.import_module(f"{args.script}.__main__")
+        original = module.script.__wrapped__
+
+        async def script(
+            context: BrowserContext,
+            profile: dict[str, Any],
+            logger
+        ) -> None:
+            await context.route("**/*", standin.route)
+            await original(context, profile, logger)
+
+        runner = execute_chromium(
+            profiles=profiles,
+            config={
+                "name": "benchmark",
+                "threads": args.threads,
+                "headless": not args.headed,
+                "user_data_dir": os.path.join(directory, "chromium"),
+                "metrics_dir": directory,
+                "journal_dir": os.path.join(directory, "journal")
+            }
+        )(script)
+        peak = [0]
+        sampler = asyncio.create_task(sample_rss(peak))
+        times = os.times()
+        started = perf_counter()
+        try:
+            await runner()
+        finally:
+            elapsed = perf_counter() - started
+            sampler.cancel()
+            standin.stop()
+        used = os.times()
+        with open(os.path.join(directory, "benchmark.jsonl"), "r") as f:
+            records = [json.loads(line) for line in f]
+    succeeded = sum(
+        1 for record in records
+        if record["phase"] == "profile" and record["status"] == "success"
+    )
+    print(f"profiles:      {succeeded}/{args.profiles} succeeded, {args.threads} threads")
+    print(f"wall time:     {elapsed:.1f}s")
+    print(f"throughput:    {args.profiles / elapsed * 60:.1f} profiles/min")
+    print(f"peak RSS:      {peak[0] / 2**20:.0f} MiB (runner and browsers)")
+    print(f"runner CPU:    {used.user - times.user + used.system - times.system:.1f}s")
+    print(
+        "children CPU:  "
+        f"{used.children_user - times.children_user + used.children_system - times.children_system:.1f}s"
+    )
+    print(f"repaints:      {standin.repaints}")
+
+
+asyncio.run(main())
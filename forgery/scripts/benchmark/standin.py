@@ -0,0 +1,259 @@
+import asyncio
+from io import BytesIO
+from threading import Thread, Lock
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from PIL import Image
+from playwright.async_api import Route
+
+
+TELEGRAM_PAGE: str = """<!DOCTYPE html>
+<html>
+<head><title>Telegram Web</title></head>
+<body>
+<input placeholder="Search">
+<button id="confirm">Confirm</button>
+<div id="app"></div>
+<script>
+document.getElementById("confirm").addEventListener("click", () => {
+    const iframe = document.createElement("iframe");
+    iframe.title = "Not Pixel Web App";
+    iframe.src = "https://app.notpx.app/";
+    iframe.style = "width: 420px; height: 720px; border: 0";
+    document.getElementById("app").appendChild(iframe);
+    document.getElementById("confirm").remove();
+});
+</script>
+</body>
+</html>
+"""
+
+# Element paths mirror the XPath locators of the claimer
+APP_PAGE: str = """<!DOCTYPE html>
+<html>
+<head><title>Not Pixel</title></head>
+<body style="margin: 0">
+<div><div>
+    <div><div><div></div><div><div></div><div><button id="menu">Menu</button></div></div></div></div>
+    <div id="panel" hidden>
+        <div></div>
+        <div>
+            <div><button id="claim">Claim</button></div>
+            <div><div id="boosts-tab">Boosts</div></div>
+            <div></div><div></div><div></div>
+            <div id="boosts" hidden><div><div></div><div>
+                <div class="boost">Reward</div>
+                <div class="boost">Recharging speed</div>
+                <div class="boost">Energy limit</div>
+            </div></div></div>
+        </div>
+    </div>
+    <div></div><div></div><div></div><div></div>
+    <div><div><button id="paint"><div><div><div></div><div><span>&#9889;</span><span id="energy">%(energy)d</span></div></div></div><div>Paint</div></button></div></div>
+</div></div>
+<canvas width="1000" height="1000" style="width: 400px; height: 400px"></canvas>
+<div id="popups">
+    <div id="promise"><button>Okay, promise</button></div>
+</div>
+<script>
+const popups = document.getElementById("popups");
+let energy = %(energy)d;
+function popup(text) {
+    const element = document.createElement("div");
+    element.textContent = text;
+    popups.appendChild(element);
+    setTimeout(() => element.remove(), 1000);
+}
+document.querySelector("#promise button").addEventListener("click", () => {
+    document.getElementById("promise").remove();
+    const go = document.createElement("button");
+    go.textContent = "Let\\u2019s Gooooooo!";
+    go.addEventListener("click", () => go.remove());
+    popups.appendChild(go);
+});
+document.getElementById("paint").addEventListener("click", () => {
+    if (energy <= 0) return;
+    energy -= 1;
+    document.getElementById("energy").textContent = energy;
+    fetch("https://notpx.app/api/v1/repaint/start", {
+        method: "POST",
+        headers: {"Content-Type": "text/plain"},
+        body: JSON.stringify({pixelId: 1, newColor: "#000000"})
+    });
+});
+document.getElementById("menu").addEventListener("click", () => {
+    document.getElementById("panel").hidden = false;
+});
+document.getElementById("claim").addEventListener("click", (event) => {
+    event.target.remove();
+});
+document.getElementById("boosts-tab").addEventListener("click", () => {
+    document.getElementById("boosts").hidden = false;
+});
+for (const boost of document.querySelectorAll(".boost")) {
+    let bought = false;
+    boost.addEventListener("click", () => {
+        const buy = document.createElement("button");
+        buy.textContent = "Buy for 5 PX";
+        buy.addEventListener("click", () => {
+            buy.remove();
+            popup(bought ? "Not enough PX" : "Well done!");
+            bought = true;
+        });
+        popups.appendChild(buy);
+    });
+}
+</script>
+</body>
+</html>
+"""
+
+PALETTE: np.ndarray = np.array(
+    [
+        (0, 0, 0), (255, 255, 255), (228, 171, 255), (255, 214, 53),
+        (190, 0, 57), (0, 163, 104), (54, 144, 234), (137, 141, 144)
+    ],
+    dtype=np.uint8
+)
+
+
+def encode(array: np.ndarray) -> bytes:
+    buffer = BytesIO()
+    Image.fromarray(array).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class StandIn:
+    def __init__(
+        self,
+        energy: int = 5,
+        canvas_size: int = 1000,
+        template_size: int = 64,
+        seed: int = 0
+    ) -> None:
+        self.energy = energy
+        self.template_size = template_size
+        self.rng = np.random.default_rng(seed)
+        self.canvas: bytes = encode(
+            PALETTE[self.rng.integers(0, len(PALETTE), (canvas_size, canvas_size))]
+        )
+        self.templates: dict[str, bytes] = {}
+        self.requests: dict[str, int] = {}
+        self.repaints: int = 0
+        self.base: str = ""
+        self._lock = Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    def template(self, template_id: str) -> bytes:
+        with self._lock:
+            if template_id not in self.templates:
+                size = self.template_size
+                self.templates[template_id] = encode(
+                    PALETTE[self.rng.integers(0, len(PALETTE), (size, size))]
+                )
+            return self.templates[template_id]
+
+    def respond(
+        self,
+        method: str,
+        path: str
+    ) -> tuple[int, str, bytes]:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+        if path == "/telegram":
+            return 200, "text/html", TELEGRAM_PAGE.encode()
+        if path == "/app":
+            return 200, "text/html", (APP_PAGE % {"energy": self.energy}).encode()
+        if path == "/image":
+            return 200, "image/png", self.canvas
+        if path.startswith("/templates/") and path.endswith(".png"):
+            return 200, "image/png", self.template(path[11:-4])
+        if path == "/repaint/start" and method == "POST":
+            with self._lock:
+                self.repaints += 1
+            return 200, "application/json", b'{"balance": 0}'
+        return 404, "text/plain", b"not found"
+
+    def start(self) -> str:
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_one(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                status, content_type, body = standin.respond(
+                    self.command,
+                    self.path
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = handle_one
+            do_POST = handle_one
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self._server.server_port}"
+        return self.base
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @staticmethod
+    def resolve(url: str) -> str | None:
+        parts = urlsplit(url)
+        if parts.hostname == "web.telegram.org":
+            return "/telegram"
+        if parts.hostname == "app.notpx.app" and parts.path in ("", "/"):
+            return "/app"
+        if parts.hostname == "notpx.app" and parts.path == "/api/v1/repaint/start":
+            return "/repaint/start"
+        if parts.hostname == "image.notpx.app":
+            return "/image"
+        if parts.hostname == "static.notpx.app" and parts.path.startswith("/templates/"):
+            return parts.path
+        return None
+
+    def fetch(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None
+    ) -> tuple[int, dict[str, str], bytes]:
+        request = Request(self.base + path, data=body, method=method)
+        try:
+            with urlopen(request) as response:
+                return response.status, dict(response.headers), response.read()
+        except HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    async def route(self, route: Route) -> None:
+        path = self.resolve(route.request.url)
+        if path is None:
+            # Nothing may leave the box during a benchmark
+            await route.abort()
+            return
+        status, headers, body = await asyncio.to_thread(
+            self.fetch,
+            route.request.method,
+            path,
+            route.request.post_data_buffer
+        )
+        await route.fulfill(
+            status=status,
+            headers=headers,
+            body=body
+        )
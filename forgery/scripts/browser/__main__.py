@@ -63,4 +63,5 @@ async def script(
     await page.wait_for_timeout(MAX_TIMEOUT)
 
 
-asyncio.run(script())
+if __name__ == "__main__":
+    asyncio.run(script())
@@ -0,0 +1,157 @@
+from io import BytesIO
+from random import shuffle
+from time import perf_counter
+from argparse import ArgumentParser
+import numpy as np
+from PIL import Image
+from scripts.notpixel.canvas import Px, decode_rgb, get_paintable_pixels
+
+
+parser = ArgumentParser(
+    "benchmark",
+    "compares the vectorized pixel diff with the per-pixel loop"
+)
+parser.add_argument(
+    "-s", "--size",
+    type=int,
+    action="append",
+    help="template side length, may be repeated"
+)
+parser.add_argument(
+    "-l", "--limit",
+    type=int,
+    default=100,
+    help="number of pixels to request"
+)
+parser.add_argument(
+    "-m", "--mismatch",
+    type=float,
+    default=0.05,
+    help="share of template pixels that differ from the canvas"
+)
+parser.add_argument(
+    "-r", "--repeat",
+    type=int,
+    default=3
+)
+
+args = parser.parse_args()
+
+
+def get_paintable_pixels_loop(
+    image: Image.Image,
+    template: Image.Image,
+    template_offset: tuple[int, int],
+    limit: int
+) -> list[Px]:
+    result = []
+    cropped_image = image.crop(
+        (
+            template_offset[0],
+            template_offset[1],
+            template_offset[0]+template.width,
+            template_offset[1]+template.height
+        )
+    )
+    xs = list(range(cropped_image.width))
+    ys = list(range(cropped_image.height))
+    shuffle(xs)
+    shuffle(ys)
+    for x in xs:
+        for y in ys:
+            t_px = Px(
+                image.width,
+                x,
+                y,
+                template.getpixel((x, y)),
+                template_offset
+            )
+            i_px = Px(
+                image.width,
+                x,
+                y,
+                cropped_image.getpixel((x, y)),
+                template_offset
+            )
+            if t_px.color_hex != i_px.color_hex:
+                result.append(t_px)
+                if len(result) == limit:
+                    return result
+    return result
+
+
+def encode(array: np.ndarray) -> bytes:
+    buffer = BytesIO()
+    Image.fromarray(array).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def fixture(
+    size: int,
+    mismatch: float,
+    rng: np.random.Generator
+) -> tuple[bytes, bytes, tuple[int, int]]:
+    offset = (7, 13)
+    canvas = rng.integers(0, 256, (size + 32, size + 32, 3), dtype=np.uint8)
+    template = canvas[
+        offset[1]:offset[1]+size,
+        offset[0]:offset[0]+size
+    ].copy()
+    changed = rng.random((size, size)) < mismatch
+    template[changed] = 255 - template[changed]
+    return encode(canvas), encode(template), offset
+
+
+def load(data: bytes) -> Image.Image:
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+def measure(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        best = min(best, perf_counter() - started)
+    return best
+
+
+rng = np.random.default_rng(0)
+# Decoding is shared by both and timed on its own, the diffs get
+# already decoded images like the canvas replica provides
+print(
+    f"{'size':>10} {'decode, ms':>12} {'loop, ms':>12} {'numpy, ms':>12} {'speedup':>9}"
+)
+for size in args.size or (100, 250, 500, 1000):
+    image, template, offset = fixture(size, args.mismatch, rng)
+    decode = measure(
+        lambda: (decode_rgb(image), decode_rgb(template)),
+        args.repeat
+    )
+    images = load(image), load(template)
+    arrays = decode_rgb(image), decode_rgb(template)
+    everything = size*size
+    expected = {
+        px.idx
+        for px
+        in get_paintable_pixels_loop(*images, offset, everything)
+    }
+    actual = {
+        px.idx
+        for px
+        in get_paintable_pixels(*arrays, offset, everything)
+    }
+    assert expected == actual, f"results differ for {size}x{size}"
+    loop = measure(
+        lambda: get_paintable_pixels_loop(*images, offset, args.limit),
+        args.repeat
+    )
+    vectorized = measure(
+        lambda: get_paintable_pixels(*arrays, offset, args.limit),
+        args.repeat
+    )
+    print(
+        f"{f'{size}x{size}':>10} {decode*1000:>12.2f} {loop*1000:>12.2f} "
+        f"{vectorized*1000:>12.2f} {loop/vectorized:>8.1f}x"
+    )
@@ -0,0 +1,236 @@
+import os
+import asyncio
+from io import BytesIO
+from time import time
+from tempfile import mkstemp
+from typing import Iterable
+import numpy as np
+from PIL import Image
+from playwright.async_api import APIRequestContext
+from src.forgery.cache import SharedCache
+
+
+CANVAS_URL: str = "https://image.notpx.app/api/v2/image"
+TEMPLATE_URL: str = "https://static.notpx.app/templates/{}.png"
+TEMPLATE_DIR: str = ".cache/notpixel/templates"
+REPLICA_PATH: str = ".cache/notpixel/canvas.npy"
+templates = SharedCache()
+
+
+class Px:
+    def __init__(
+        self,
+        image_w: int,
+        x: int,
+        y: int,
+        rgb: tuple,
+        offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        self.x = x + offset[0]
+        self.y = y + offset[1]
+        self.idx = self.y*image_w + self.x+1
+        self.r, self.g, self.b = rgb[:3]
+        self.color_hex = f"#{self.r:02x}{self.g:02x}{self.b:02x}".upper()
+
+
+def decode_rgb(
+    image: bytes | Image.Image
+) -> np.ndarray:
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(BytesIO(image))
+    return np.asarray(image.convert("RGB"))
+
+
+def crop(
+    canvas: np.ndarray,
+    offset: tuple[int, int],
+    size: tuple[int, int]
+) -> np.ndarray:
+    # Mirrors PIL's crop: regions outside the canvas read as black
+    w, h = size
+    result = np.zeros((h, w, 3), dtype=np.uint8)
+    x0, y0 = offset
+    src = canvas[
+        max(y0, 0):max(y0 + h, 0),
+        max(x0, 0):max(x0 + w, 0)
+    ]
+    dy, dx = max(-y0, 0), max(-x0, 0)
+    result[dy:dy+src.shape[0], dx:dx+src.shape[1]] = src
+    return result
+
+
+def mismatched_indices(
+    canvas: np.ndarray,
+    template: np.ndarray,
+    offset: tuple[int, int]
+) -> np.ndarray:
+    h, w = template.shape[:2]
+    region = crop(canvas, offset, (w, h))
+    mask = np.any(region != template[..., :3], axis=2)
+    return np.flatnonzero(mask)
+
+
+def get_paintable_pixels(
+    canvas: np.ndarray,
+    template: np.ndarray,
+    template_offset: tuple[int, int],
+    limit: int,
+    rng: np.random.Generator | None = None,
+    exclude: Iterable[int] | None = None
+) -> list[Px]:
+    rng = rng or np.random.default_rng()
+    h, w = template.shape[:2]
+    indices = mismatched_indices(canvas, template, template_offset)
+    if exclude:
+        # Px.idx is a 1-based canvas index, map it back into the template
+        ys, xs = np.divmod(
+            np.fromiter(exclude, dtype=np.int64) - 1,
+            canvas.shape[1]
+        )
+        xs -= template_offset[0]
+        ys -= template_offset[1]
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        indices = np.setdiff1d(
+            indices,
+            ys[inside]*w + xs[inside],
+            assume_unique=True
+        )
+    if len(indices) > limit:
+        indices = rng.choice(indices, size=limit, replace=False)
+    else:
+        rng.shuffle(indices)
+    ys, xs = np.divmod(indices, w)
+    colors = template[ys, xs, :3]
+    return [
+        Px(
+            canvas.shape[1],
+            int(x),
+            int(y),
+            tuple(int(c) for c in rgb),
+            template_offset
+        )
+        for x, y, rgb in zip(xs, ys, colors)
+    ]
+
+
+async def download(
+    requester: APIRequestContext,
+    url: str
+) -> bytes:
+    response = await requester.get(url)
+    if not response.ok:
+        raise RuntimeError(f"{url} responded with {response.status}")
+    return await response.body()
+
+
+def save(
+    path: str,
+    array: np.ndarray
+) -> None:
+    # Shards and parallel runs write the same files, so every writer gets
+    # its own temporary name and the last complete file wins
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = mkstemp(
+        dir=directory,
+        prefix=".",
+        suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+class Replica:
+    def __init__(
+        self,
+        path: str = REPLICA_PATH,
+        ttl: float = 30
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.array: np.ndarray | None = None
+        self.refreshes: int = 0
+        self.deltas: int = 0
+        self._inode: int | None = None
+        self._lock = asyncio.Lock()
+
+    def age(self) -> float:
+        try:
+            return time() - os.stat(self.path + ".stamp").st_mtime
+        except FileNotFoundError:
+            return float("inf")
+
+    def _open(self) -> None:
+        # Another process may have swapped in a newer download
+        inode = os.stat(self.path).st_ino
+        if self.array is None or inode != self._inode:
+            self.array = np.load(self.path, mmap_mode="r+")
+            self._inode = inode
+
+    def _write(self, array: np.ndarray) -> None:
+        save(self.path, array)
+        with open(self.path + ".stamp", "w"):
+            pass
+
+    async def get(
+        self,
+        requester: APIRequestContext,
+        ttl: float | None = None
+    ) -> np.ndarray:
+        async with self._lock:
+            if self.age() > (self.ttl if ttl is None else ttl):
+                body = await download(requester, CANVAS_URL)
+                array = await asyncio.to_thread(decode_rgb, body)
+                await asyncio.to_thread(self._write, array)
+                self.refreshes += 1
+            self._open()
+            return self.array
+
+    def apply(
+        self,
+        idx: int,
+        color_hex: str
+    ) -> None:
+        # Own repaints go straight into the shared file, so diffs see them
+        # before the next download
+        try:
+            self._open()
+        except FileNotFoundError:
+            return
+        y, x = divmod(idx - 1, self.array.shape[1])
+        self.array[y, x] = tuple(
+            int(color_hex[i:i+2], 16)
+            for i in (1, 3, 5)
+        )
+        self.deltas += 1
+
+
+replica = Replica()
+
+
+async def fetch_canvas(
+    requester: APIRequestContext,
+    ttl: float | None = None
+) -> np.ndarray:
+    return await replica.get(requester, ttl)
+
+
+async def fetch_template(
+    requester: APIRequestContext,
+    template_id: str,
+    directory: str | None = None
+) -> np.ndarray:
+    directory = directory or TEMPLATE_DIR
+    path = os.path.join(directory, f"{template_id}.npy")
+    async def load() -> np.ndarray:
+        if not os.path.exists(path):
+            body = await download(requester, TEMPLATE_URL.format(template_id))
+            array = await asyncio.to_thread(decode_rgb, body)
+            await asyncio.to_thread(save, path, array)
+        return np.load(path, mmap_mode="r")
+    return await templates.get(path, load)
@@ -1,95 +1,55 @@
 from typing import Any
-from io import BytesIO
+import json
 import asyncio
-from random import shuffle, choice
-from time import time
-from PIL import Image
-from PIL import ImageColor
+from time import monotonic, time
 from src.forgery.automation import execute_chromium
+from src.forgery.metrics import span, record, note
+from src.forgery.planning import observe
+from src.forgery.waiting import first
+from src.forgery.snapshot import snapshot
+from scripts.notpixel.canvas import Px, fetch_canvas, fetch_template, get_paintable_pixels, replica
+from scripts.notpixel.reservation import reservations
+from scripts.notpixel.templates import assignment
 from playwright.async_api import BrowserContext, expect, Locator, FrameLocator, Error, Route
 
 
-class Px:
-    def __init__(
-        self,
-        image_w: int,
-        x: int,
-        y: int,
-        rgb: tuple,
-        offset: tuple[int, int] = (0, 0)
-    ) -> None:
-        self.x = x + offset[0]
-        self.y = y + offset[1]
-        self.idx = self.y*image_w + self.x+1
-        self.r, self.g, self.b = rgb[:3]
-        self.color_hex = f"#{self.r:02x}{self.g:02x}{self.b:02x}".upper()
-
-
-async def get_paintable_pixels(
-    image: bytes,
-    template: bytes,
-    template_offset: tuple[int, int],
-    limit: int
-) -> list[Px]:
-    result = []
-    image = Image.open(BytesIO(image))
-    template = Image.open(BytesIO(template))
-    cropped_image = image.crop(
-        (
-            template_offset[0],
-            template_offset[1],
-            template_offset[0]+template.width,
-            template_offset[1]+template.height
-        )
-    )
-    assert cropped_image.width == template.width
-    assert cropped_image.height == template.height
-    xs = list(range(cropped_image.width))
-    ys = list(range(cropped_image.height))
-    shuffle(xs)
-    shuffle(ys)
-    for x in xs:
-        for y in ys:
-            t_px = Px(
-                image.width,
-                x,
-                y,
-                template.getpixel((x, y)),
-                template_offset
-            )
-            i_px = Px(
-                image.width,
-                x,
-                y,
-                cropped_image.getpixel((x, y)),
-                template_offset
-            )
-            if t_px.color_hex != i_px.color_hex:
-                result.append(t_px)
-                if len(result) == limit:
-                    return result
-    return result
+CONFIG: str = "scripts/notpixel/claimer/config.json"
+with open(CONFIG, "r") as f:
+    config: dict[str, Any] = json.load(f)
+REPAINT_URL: str = "https://notpx.app/api/v1/repaint/start"
+reservations.ttl = config.get("reservation_ttl", reservations.ttl)
+assignment.expected_energy = config.get("expected_energy", assignment.expected_energy)
+assignment.timeout = config.get("deficits_timeout", assignment.timeout)
 
 
 @execute_chromium(
     profiles="profiles.json",
-    config="scripts/notpixel/claimer/config.json"
+    config=CONFIG
 )
 async def script(
     context: BrowserContext,
     profile: dict[str, Any],
     logger
 ) -> None:
+    pxs: list[Px] = []
+    painted: set[int] = set()
+
     async def route_repaint_start(
         route: Route,
     ):
         try:
             post_data = route.request.post_data_json
-            if post_data:
+            if not post_data:
+                await route.fallback()
+            elif not pxs:
+                # The app would paint its own pick otherwise
+                await route.abort()
+            else:
                 px = pxs.pop()
+                painted.add(px.idx)
                 post_data["newColor"] = px.color_hex
                 post_data["pixelId"] = px.idx
-                await route.continue_(
+                await route.fallback(
                     post_data=post_data
                 )
         except Error:
@@ -100,146 +60,253 @@ async def script(
 
     page = context.pages[0]
     await page.route(
-        "https://notpx.app/api/v1/repaint/start",
+        REPAINT_URL,
         route_repaint_start
     )
-    TEMPLATES = (
-        ("1353629816", (36, 793)),
-        ("6355200889", (75, 506)),
-        ("1750502312", (493, 913)),
-        ("305094295", (844, 683)),
-        ("6597594922", (400, 1)),
-        ("1166266887", (826, 268)),
-        ("355876562", (800, 800))
-    )
-    template = choice(TEMPLATES)
-    await page.goto(
-        f"https://web.telegram.org/a/#?tgaddr=tg%3A%2F%2Fresolve%3Fdomain%3Dnotpixel%26appname%3Dapp%26startapp%3Df{template[0]}_t"
-    )
-    confirm_launch_button: Locator = page.get_by_role(
-        "button",
-        name="Confirm",
-        exact=True
-    )
-    app_iframe: Locator = page.get_by_title(
-        text="not pixel web app"
-    )
-    app_frame: FrameLocator
     try:
-        await confirm_launch_button.click(
-            timeout=10000
+        await assignment.refresh(
+            page.request,
+            ttl=config.get("canvas_ttl")
         )
-        logger.info(
-            "App launch confirmed",
+    except Exception as e:
+        logger.warning(
+            f"Template deficits unavailable, picking at random: {e}",
             id=profile["id"]
         )
-    except Error: pass
+    template_id, template_offset, estimated_energy = assignment.assign()
+    template = (template_id, template_offset)
+    energy: int | None = None
     try:
-        await expect(app_iframe).to_be_visible(
+        await page.goto(
+            f"https://web.telegram.org/a/#?tgaddr=tg%3A%2F%2Fresolve%3Fdomain%3Dnotpixel%26appname%3Dapp%26startapp%3Df{template[0]}_t"
+        )
+        confirm_launch_button: Locator = page.get_by_role(
+            "button",
+            name="Confirm",
+            exact=True
+        )
+        app_iframe: Locator = page.get_by_title(
+            text="not pixel web app"
+        )
+        app_frame: FrameLocator
+        if await first(
+            {
+                "confirm": confirm_launch_button,
+                "app": app_iframe
+            },
             timeout=10000
+        ) == "confirm":
+            try:
+                await confirm_launch_button.click(
+                    timeout=10000
+                )
+                logger.info(
+                    "App launch confirmed",
+                    id=profile["id"]
+                )
+            except Error: pass
+        try:
+            await expect(app_iframe).to_be_visible(
+                timeout=10000
+            )
+            app_frame = app_iframe.content_frame
+        except AssertionError:
+            logger.error(
+                "App frame not found",
+                id=profile["id"]
+            )
+            return
+        else:
+            logger.info(
+                "App frame found",
+                id=profile["id"]
+            )
+        proceed_button: Locator = app_frame.get_by_role(
+            "button",
+            name="Okay, promise",
+            exact=True
         )
-        app_frame = app_iframe.content_frame
-    except AssertionError:
-        logger.error(
-            "App frame not found",
-            id=profile["id"]
+        proceed_further_button: Locator = app_frame.get_by_role(
+            "button",
+            name="Let’s Gooooooo!",
+            exact=True
         )
-        return
-    else:
-        logger.info(
-            "App frame found",
-            id=profile["id"]
+        canvas: Locator = app_frame.locator(
+            "xpath=/html/body/canvas"
         )
-    proceed_button: Locator = app_frame.get_by_role(
-        "button",
-        name="Okay, promise",
-        exact=True
-    )
-    proceed_further_button: Locator = app_frame.get_by_role(
-        "button",
-        name="Let’s Gooooooo!",
-        exact=True
-    )
-    canvas: Locator = app_frame.locator(
-        "xpath=/html/body/canvas"
-    )
-    paint_span: Locator = app_frame.get_by_text(
-        "Paint"
-    )
-    energy_span: Locator = app_frame.locator(
-        "xpath=/html/body/div[1]/div/div[7]/div/button/div[1]/div/div[2]/span[2]"
-    )
-    menu_button: Locator = app_frame.locator(
-        "xpath=/html/body/div[1]/div/div[1]/div/div[2]/div[2]/button"
-    )
-    claim_span: Locator = app_frame.get_by_role(
-        "button",
-        name="Claim"
-    )
-    boosts_div: Locator = app_frame.get_by_text(
-        "Boosts",
-        exact=True
-    )
-    paint_reward_boost: Locator = app_frame.locator(
-        "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[1]"
-    )
-    recharging_speed_boost: Locator = app_frame.locator(
-        "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[2]"
-    )
-    energy_limit_boost: Locator = app_frame.locator(
-        "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[3]"
-    )
-    buy_for_button: Locator = app_frame.get_by_role(
-        "button",
-        name="Buy for"
-    )
-    fail_popup: Locator = app_frame.get_by_text(
-        "not enough px"
-    )
-    success_popup: Locator = app_frame.get_by_text(
-        "well done"
-    )
-    try:
-        await proceed_button.click(timeout=10000)
-        logger.info(
-            "Pop-up closed",
-            id=profile["id"]
+        paint_span: Locator = app_frame.get_by_text(
+            "Paint"
         )
-    except Error: pass
-    try:
-        await proceed_further_button.click(timeout=10000)
-        logger.success(
-            "Game entered!",
-            id=profile["id"]
+        energy_span: Locator = app_frame.locator(
+            "xpath=/html/body/div[1]/div/div[7]/div/button/div[1]/div/div[2]/span[2]"
         )
-    except Error: pass
-    await canvas.wait_for()
-    canvas_rect = await canvas.bounding_box()
-    await page.mouse.click(
-        canvas_rect["x"] + int(canvas_rect["width"]/2),
-        canvas_rect["y"] + int(canvas_rect["height"]/2)
-    )
-    energy = int(await energy_span.inner_text())
+        menu_button: Locator = app_frame.locator(
+            "xpath=/html/body/div[1]/div/div[1]/div/div[2]/div[2]/button"
+        )
+        claim_span: Locator = app_frame.get_by_role(
+            "button",
+            name="Claim"
+        )
+        boosts_div: Locator = app_frame.get_by_text(
+            "Boosts",
+            exact=True
+        )
+        boost_selectors: dict[str, str] = {
+            "paint reward": "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[1]",
+            "energy limit": "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[3]",
+            "recharging speed": "xpath=/html/body/div[1]/div/div[2]/div[2]/div[6]/div/div[2]/div[2]"
+        }
+        buy_for_button: Locator = app_frame.get_by_role(
+            "button",
+            name="Buy for"
+        )
+        fail_popup: Locator = app_frame.get_by_text(
+            "not enough px"
+        )
+        success_popup: Locator = app_frame.get_by_text(
+            "well done"
+        )
+        popups: dict[str, Locator] = {
+            "proceed": proceed_button,
+            "proceed further": proceed_further_button,
+            "canvas": canvas
+        }
+        timeout: int = 10000
+        while found := await first(popups, timeout=timeout):
+            if found == "canvas":
+                # Pop-ups may still show up over a rendered canvas
+                popups.pop(found)
+                timeout = config.get("popup_grace", 2000)
+                continue
+            try:
+                await popups.pop(found).click(timeout=5000)
+            except Error:
+                continue
+            if found == "proceed":
+                logger.info(
+                    "Pop-up closed",
+                    id=profile["id"]
+                )
+            else:
+                logger.success(
+                    "Game entered!",
+                    id=profile["id"]
+                )
+        await canvas.wait_for()
+        canvas_rect = await canvas.bounding_box()
+        await page.mouse.click(
+            canvas_rect["x"] + int(canvas_rect["width"]/2),
+            canvas_rect["y"] + int(canvas_rect["height"]/2)
+        )
+        energy = int(await energy_span.inner_text())
+    finally:
+        # Profiles that stop early give their estimate back, so the
+        # deficits they would have painted do not look covered
+        assignment.settle(template[0], estimated_energy, energy)
     if energy:
         # NOTE: Need to dispose of the request context?
         requester = page.request
-        image = await (await requester.get("https://image.notpx.app/api/v2/image")).body()
-        # template = await (await requester.get("https://app.notpx.app/assets/durovoriginal-CqJYkgok.png")).body()
-        template_image = await (await requester.get(f"https://static.notpx.app/templates/{template[0]}.png")).body()
-        pxs = await get_paintable_pixels(
-            image,
-            template_image,
-            template[1],
-            limit=energy
-        )
-        for _ in range(energy):
-            await paint_span.click()
-            await page.wait_for_timeout(500)
+
+        async def refill(limit: int) -> None:
+            with span("pixels"):
+                image = await fetch_canvas(
+                    requester,
+                    ttl=config.get("canvas_ttl")
+                )
+                template_image = await fetch_template(
+                    requester,
+                    template[0]
+                )
+                # The cached canvas may not show our own repaints yet,
+                # and pixels other profiles hold are filtered afterwards
+                fresh = await asyncio.to_thread(
+                    get_paintable_pixels,
+                    image,
+                    template_image,
+                    template[1],
+                    limit=limit + reservations.held_by_others(profile["id"]),
+                    exclude={px.idx for px in pxs} | painted
+                )
+            pxs[:0] = reservations.reserve(
+                profile["id"],
+                fresh,
+                limit
+            )
+
+        results: dict[str, int] = {"success": 0, "failure": 0}
+        interval: float = config.get("paint_interval", 100) / 1000
+        clicked: float = 0.0
+        avoided: int = reservations.avoided
+        exhausted: bool = False
+        with span("paint"):
+            try:
+                for remaining in range(energy, 0, -1):
+                    if len(pxs) < min(remaining, config.get("paint_low_water", 1)):
+                        await refill(remaining - len(pxs))
+                    if not pxs:
+                        logger.info(
+                            "Nothing left to paint",
+                            id=profile["id"]
+                        )
+                        exhausted = True
+                        break
+                    await asyncio.sleep(max(clicked + interval - monotonic(), 0))
+                    clicked = monotonic()
+                    try:
+                        async with page.expect_response(
+                            lambda response: (
+                                response.url == REPAINT_URL
+                                and response.request.method == "POST"
+                            ),
+                            timeout=10000
+                        ) as response_info:
+                            await paint_span.click()
+                        response = await response_info.value
+                    except Error:
+                        logger.warning(
+                            "Repaint not answered",
+                            id=profile["id"]
+                        )
+                        break
+                    status = "success" if response.ok else "failure"
+                    results[status] += 1
+                    if response.ok:
+                        repainted = response.request.post_data_json
+                        replica.apply(repainted["pixelId"], repainted["newColor"])
+                    record("repaint", monotonic() - clicked, status)
+            finally:
+                # Unused pixels go back to the other profiles right away
+                reservations.release(
+                    profile["id"],
+                    [px.idx for px in pxs]
+                )
+        # Leftover energy is useless without pixels to paint, so the
+        # profile waits a full recharge instead of being due right away
+        observe(energy=0 if exhausted else energy - results["success"])
         logger.success(
-            f"Energy points used: {energy}!",
+            f"Energy points used: {results['success']}!",
             id=profile["id"]
         )
+        if results["failure"]:
+            logger.warning(
+                f"Repaints failed: {results['failure']}",
+                id=profile["id"]
+            )
+        note(
+            "Canvas replica",
+            {
+                "downloads": replica.refreshes,
+                "own repaints applied": replica.deltas
+            }
+        )
+        if reservations.avoided > avoided:
+            logger.info(
+                f"Duplicate paints avoided: {reservations.avoided - avoided} "
+                f"({reservations.avoided} in this process)",
+                id=profile["id"]
+            )
     else:
+        observe(energy=0)
         logger.info(
             "No energy",
             id=profile["id"]
@@ -258,6 +325,7 @@ async def script(
             id=profile["id"]
         )
     else:
+        observe(claimed=time())
         logger.success(
             "Points claimed!",
             id=profile["id"]
@@ -274,29 +342,53 @@ async def script(
     # except Error: pass
     await boosts_div.click()
     boosts: int = 0
-    unavail = []
-    while True:
-        for boost in (
-            paint_reward_boost,
-            energy_limit_boost,
-            recharging_speed_boost
-        ):
-            if boost not in unavail:
-                try:
-                    await boost.click(timeout=5000)
-                    await buy_for_button.click(timeout=5000)
-                    await buy_for_button.wait_for(state="detached")
-                    await page.wait_for_timeout(500)
-                    if await fail_popup.first.is_visible():
-                        unavail.append(boost)
-                        await fail_popup.first.wait_for(state="detached")
-                    elif await success_popup.first.is_visible():
-                        await success_popup.first.wait_for(state="detached")
-                        boosts += 1
-                except Error:
-                    unavail.append(boost)
-        if len(unavail) == 3:
-            break
+    # The sheet may render after the click, so one boost has to show up
+    # before the others are read. Missing ones are skipped up front
+    # instead of timing out on a click each
+    available: list[str] = []
+    if await first(
+        {
+            name: app_frame.locator(selector)
+            for name, selector in boost_selectors.items()
+        },
+        timeout=5000
+    ):
+        available = [
+            name
+            for name, element in (
+                await snapshot(app_frame.locator(":root"), boost_selectors)
+            ).items()
+            if element.visible
+        ]
+    if not available:
+        logger.warning(
+            "No boosts visible",
+            id=profile["id"]
+        )
+    while available:
+        for name in list(available):
+            try:
+                await app_frame.locator(boost_selectors[name]).click(timeout=5000)
+                await buy_for_button.click(timeout=5000)
+                await buy_for_button.wait_for(state="detached")
+                outcome = await first(
+                    {
+                        "fail": fail_popup.first,
+                        "success": success_popup.first
+                    },
+                    timeout=2000
+                )
+            except Error:
+                available.remove(name)
+                continue
+            if outcome == "success":
+                await success_popup.first.wait_for(state="detached")
+                boosts += 1
+            else:
+                # Unanswered purchases are not retried forever
+                available.remove(name)
+                if outcome == "fail":
+                    await fail_popup.first.wait_for(state="detached")
     if boosts:
         logger.success(
             f"Boosts made: {boosts}",
@@ -304,4 +396,5 @@ async def script(
         )
 
 
-asyncio.run(script())
+if __name__ == "__main__":
+    asyncio.run(script())
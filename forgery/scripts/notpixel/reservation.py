@@ -0,0 +1,64 @@
+from time import monotonic
+from scripts.notpixel.canvas import Px
+
+
+class Reservations:
+    def __init__(
+        self,
+        ttl: float = 120
+    ) -> None:
+        self.ttl = ttl
+        self.avoided: int = 0
+        self._held: dict[int, tuple[str, float]] = {}
+
+    def _expire(self) -> None:
+        now = monotonic()
+        for idx in [
+            idx
+            for idx, (_, expires) in self._held.items()
+            if expires <= now
+        ]:
+            del self._held[idx]
+
+    def held_by_others(self, owner: str) -> int:
+        self._expire()
+        return sum(
+            1 for held_by, _ in self._held.values()
+            if held_by != owner
+        )
+
+    def reserve(
+        self,
+        owner: str,
+        candidates: list[Px],
+        limit: int
+    ) -> list[Px]:
+        # Runs without awaiting, so concurrent profiles get disjoint batches
+        self._expire()
+        expires = monotonic() + self.ttl
+        taken: list[Px] = []
+        for position, px in enumerate(candidates):
+            if len(taken) == limit:
+                break
+            held = self._held.get(px.idx)
+            if held and held[0] != owner:
+                # The owner would have painted this one next to someone else
+                if position < limit:
+                    self.avoided += 1
+                continue
+            self._held[px.idx] = (owner, expires)
+            taken.append(px)
+        return taken
+
+    def release(
+        self,
+        owner: str,
+        idxs: list[int]
+    ) -> None:
+        for idx in idxs:
+            held = self._held.get(idx)
+            if held and held[0] == owner:
+                del self._held[idx]
+
+
+reservations = Reservations()
@@ -0,0 +1,125 @@
+import asyncio
+from random import choice, choices
+from playwright.async_api import APIRequestContext
+from src.forgery.metrics import current_run, note
+from scripts.notpixel.canvas import fetch_canvas, fetch_template, mismatched_indices
+
+
+TEMPLATES: tuple[tuple[str, tuple[int, int]], ...] = (
+    ("1353629816", (36, 793)),
+    ("6355200889", (75, 506)),
+    ("1750502312", (493, 913)),
+    ("305094295", (844, 683)),
+    ("6597594922", (400, 1)),
+    ("1166266887", (826, 268)),
+    ("355876562", (800, 800))
+)
+
+
+class Assignment:
+    def __init__(
+        self,
+        templates: tuple[tuple[str, tuple[int, int]], ...] = TEMPLATES,
+        expected_energy: int = 10,
+        timeout: float = 30
+    ) -> None:
+        self.templates = dict(templates)
+        self.expected_energy = expected_energy
+        self.timeout = timeout
+        self.deficits: dict[str, int] = {}
+        self.committed: dict[str, int] = {}
+        self._run: object = None
+        self._failed: object = None
+        self._energies: list[int] = []
+        self._lock = asyncio.Lock()
+
+    async def refresh(
+        self,
+        requester: APIRequestContext,
+        ttl: float | None = None
+    ) -> None:
+        # Deficits are computed by the first profile of every run,
+        # the others wait for it instead of diffing on their own. One
+        # failed attempt makes the rest of the run pick at random
+        async with self._lock:
+            run = current_run()
+            if self.deficits and run is self._run:
+                return
+            if run is not None and run is self._failed:
+                raise RuntimeError("refresh already failed in this run")
+            try:
+                deficits = await asyncio.wait_for(
+                    self._diff(requester, ttl),
+                    self.timeout
+                )
+            except asyncio.TimeoutError:
+                self._forget(run)
+                raise RuntimeError(f"no deficits within {self.timeout:g}s")
+            except Exception:
+                self._forget(run)
+                raise
+            self.deficits = deficits
+            self.committed = dict.fromkeys(deficits, 0)
+            self._energies = []
+            self._run = run
+            note("Template deficits", self.deficits)
+            note("Template energy assigned", self.committed)
+
+    def _forget(self, run: object) -> None:
+        # The previous run's numbers would skew the random fallback
+        self._failed = run
+        self.deficits = {}
+        self.committed = {}
+
+    async def _diff(
+        self,
+        requester: APIRequestContext,
+        ttl: float | None
+    ) -> dict[str, int]:
+        canvas = await fetch_canvas(requester, ttl=ttl)
+        deficits: dict[str, int] = {}
+        for template_id, offset in self.templates.items():
+            template = await fetch_template(requester, template_id)
+            deficits[template_id] = len(
+                await asyncio.to_thread(
+                    mismatched_indices,
+                    canvas,
+                    template,
+                    offset
+                )
+            )
+        return deficits
+
+    def estimate(self) -> int:
+        if not self._energies:
+            return self.expected_energy
+        return round(sum(self._energies) / len(self._energies))
+
+    def assign(self) -> tuple[str, tuple[int, int], int]:
+        energy = self.estimate()
+        weights = [
+            max(self.deficits.get(template_id, 0) - self.committed.get(template_id, 0), 0)
+            for template_id in self.templates
+        ]
+        if any(weights):
+            template_id = choices(list(self.templates), weights=weights)[0]
+        else:
+            template_id = choice(list(self.templates))
+        self.committed[template_id] = self.committed.get(template_id, 0) + energy
+        return template_id, self.templates[template_id], energy
+
+    def settle(
+        self,
+        template_id: str,
+        estimated: int,
+        energy: int | None
+    ) -> None:
+        # None when the profile stopped before its energy was read
+        if energy is not None:
+            self._energies.append(energy)
+        self.committed[template_id] = (
+            self.committed.get(template_id, 0) - estimated + (energy or 0)
+        )
+
+
+assignment = Assignment()
@@ -0,0 +1,32 @@
+import json
+import asyncio
+from typing import Any
+from playwright.async_api import BrowserContext
+from src.forgery.automation import execute_chromium
+from src.forgery.pipeline import run_steps
+
+
+CONFIG: str = "scripts/pipeline/config.json"
+with open(CONFIG, "r") as f:
+    config: dict[str, Any] = json.load(f)
+
+
+@execute_chromium(
+    profiles="profiles.json",
+    config=CONFIG
+)
+async def script(
+    context: BrowserContext,
+    profile: dict[str, Any],
+    logger
+) -> None:
+    await run_steps(
+        context,
+        profile,
+        logger,
+        config["steps"]
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(script())
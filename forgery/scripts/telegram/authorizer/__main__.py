@@ -1,12 +1,22 @@
+import json
 import asyncio
 from typing import Any
 from src.forgery.automation import execute_chromium
+from src.forgery.pipeline import visit
+from src.forgery.prompts import open_prompts
+from src.forgery.waiting import first
 from playwright.async_api import BrowserContext, ElementHandle, Locator
 
 
+CONFIG: str = "scripts/telegram/authorizer/config.json"
+with open(CONFIG, "r") as f:
+    config: dict[str, Any] = json.load(f)
+prompts = open_prompts(config.get("input", {}))
+
+
 @execute_chromium(
     profiles="profiles.json",
-    config="scripts/telegram/authorizer/config.json"
+    config=CONFIG
 )
 async def script(
     context: BrowserContext,
@@ -39,13 +49,15 @@ async def script(
         name="Next"
     )
 
-    await page.goto("https://web.telegram.org/a")
-    while True:
-        await page.wait_for_timeout(500)
-        if await search_bar.all():
-            return
-        elif await log_in_by_phone_button.all():
-            break
+    await visit(page, "https://web.telegram.org/a")
+    if await first(
+        {
+            "search": search_bar.first,
+            "log in": log_in_by_phone_button.first
+        },
+        state="attached"
+    ) == "search":
+        return
     await log_in_by_phone_button.click()
     await phone_input.fill(
         "+" + profile["phone"]
@@ -56,7 +68,10 @@ async def script(
         id=profile["id"]
     )
     await code_input.fill(
-        input(f"Enter an authentication code for {profile['id']}: ")
+        await prompts.ask(
+            profile["id"],
+            f"Enter an authentication code for {profile['id']}"
+        )
     )
     if profile["telegram"].get("password"):
         await password_input.fill(
@@ -67,15 +82,16 @@ async def script(
             "Password submitted",
             id=profile["id"]
         )
-    while True:
-        await page.wait_for_timeout(500)
-        if await search_bar.all():
-            await page.wait_for_timeout(5000)
-            logger.success(
-                "Authorized!",
-                id=profile["id"]
-            )
-            return
+    await search_bar.first.wait_for(
+        state="attached",
+        timeout=0
+    )
+    await page.wait_for_timeout(5000)
+    logger.success(
+        "Authorized!",
+        id=profile["id"]
+    )
 
 
-asyncio.run(script())
+if __name__ == "__main__":
+    asyncio.run(script())
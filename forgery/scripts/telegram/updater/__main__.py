@@ -2,6 +2,7 @@ import asyncio
 from typing import Any
 from playwright.async_api import BrowserContext, Locator, Error
 from src.forgery.automation import execute_chromium
+from src.forgery.pipeline import visit
 
 
 @execute_chromium(
@@ -14,7 +15,7 @@ async def script(
     logger
 ) -> None:
     page = context.pages[0]
-    await page.goto(f"https://web.telegram.org/a")
+    await visit(page, "https://web.telegram.org/a")
     update_telegram_button: Locator = page.get_by_text(
         "update telegram"
     )
@@ -33,4 +34,5 @@ async def script(
         )
 
 
-asyncio.run(script())
+if __name__ == "__main__":
+    asyncio.run(script())
@@ -1,10 +1,34 @@
 import sys
+from typing import Any, Callable
 from loguru import logger
 
 
 MAX_TIMEOUT: int = 2147483647
+FORMAT: str = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | {extra[id]} | <level>{level}</level>: <level>{message}</level>"
 logger.remove(0)
+logger.configure(extra={"id": "-", "phase": "-", "run": "-"})
+# Records are handed to a writer thread, so logging never blocks the event loop
 logger.add(
     sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | {extra[id]} | <level>{level}</level>: <level>{message}</level>"
+    format=FORMAT,
+    enqueue=True
 )
+
+
+def add_sink(
+    path: str,
+    options: dict[str, Any],
+    filter: Callable[[dict], bool] | None = None
+) -> int:
+    kwargs: dict[str, Any] = {
+        "enqueue": True,
+        "rotation": options.get("rotation"),
+        "retention": options.get("retention"),
+        "compression": options.get("compression"),
+        "filter": filter
+    }
+    if options.get("format") == "json":
+        kwargs["serialize"] = True
+    else:
+        kwargs["format"] = FORMAT
+    return logger.add(path, **kwargs)
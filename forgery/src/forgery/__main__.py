@@ -0,0 +1,113 @@
+import sys
+import json
+import asyncio
+from argparse import ArgumentParser
+from src.forgery.supervisor import Supervisor, stop
+from src.forgery.profiles import SqliteProfileStore
+from src.forgery.maintenance import default_user_data_dir, survey, compact
+
+
+parser = ArgumentParser(
+    "forgery",
+    ""
+)
+commands = parser.add_subparsers(
+    dest="command",
+    required=True
+)
+supervise_parser = commands.add_parser(
+    "supervise",
+    help="run scripts on a schedule with one resident browser driver"
+)
+supervise_parser.add_argument(
+    "config",
+    type=str,
+    nargs="?",
+    default="supervisor.json",
+    help="path to a supervisor config"
+)
+stop_parser = commands.add_parser(
+    "stop",
+    help="let a running supervisor finish its scripts and exit"
+)
+index_parser = commands.add_parser(
+    "index",
+    help="copy profiles from a JSON file into an SQLite profile store"
+)
+index_parser.add_argument(
+    "source",
+    type=str,
+    help="path to a profiles JSON file"
+)
+index_parser.add_argument(
+    "destination",
+    type=str,
+    help="path to an SQLite database, created if missing"
+)
+maintain_parser = commands.add_parser(
+    "maintain",
+    help="report disk usage of profile directories and prune their caches"
+)
+maintain_parser.add_argument(
+    "user_data_dir",
+    type=str,
+    nargs="?",
+    help="directory holding the profile directories"
+)
+maintain_parser.add_argument(
+    "-p", "--prune",
+    action="store_true",
+    help="delete disposable cache directories, login state is kept"
+)
+maintain_parser.add_argument(
+    "-t", "--threads",
+    type=int,
+    default=8,
+    help="profiles processed at once"
+)
+maintain_parser.add_argument(
+    "-m", "--min_size",
+    type=float,
+    default=0,
+    help="only prune profiles larger than this many MiB"
+)
+
+args = parser.parse_args()
+
+if args.command == "supervise":
+    asyncio.run(Supervisor(args.config).run())
+elif args.command == "stop":
+    if not stop():
+        print("Supervisor is not running", file=sys.stderr)
+        sys.exit(1)
+elif args.command == "index":
+    with open(args.source, "r") as f:
+        profiles = json.load(f)
+    store = SqliteProfileStore(args.destination)
+    print(f"{store.write(profiles)} profiles indexed")
+    store.close()
+elif args.command == "maintain":
+    user_data_dir = args.user_data_dir or default_user_data_dir()
+    sizes = asyncio.run(survey(user_data_dir, concurrency=args.threads))
+    freed: dict[str, int] = {}
+    if args.prune:
+        freed = asyncio.run(
+            compact(
+                user_data_dir,
+                [
+                    profile_id
+                    for profile_id, size in sizes.items()
+                    if size > args.min_size * 2**20
+                ],
+                concurrency=args.threads
+            )
+        )
+    for profile_id, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        line = f"{profile_id}\t{size / 2**20:.1f} MiB"
+        if freed.get(profile_id):
+            line += f"\t-{freed[profile_id] / 2**20:.1f} MiB"
+        print(line)
+    print(
+        f"{len(sizes)} profiles, {sum(sizes.values()) / 2**20:.1f} MiB"
+        + (f", {sum(freed.values()) / 2**20:.1f} MiB freed" if args.prune else "")
+    )
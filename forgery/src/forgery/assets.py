@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import asyncio
+from hashlib import sha256
+from fnmatch import translate
+from tempfile import mkstemp
+from urllib.parse import urlsplit
+from typing import Any
+from playwright.async_api import BrowserContext, Route, Error
+from src.core.utils import logger
+from src.forgery.cache import SharedCache
+
+
+ASSETS_DIR: str = ".cache/forgery/assets"
+# A content hash right before the extension: webpack-style hex
+# (main.3f9a1c2b.js) or Vite's 8 base64url characters (index-B_x3kR9a.js)
+HASHED = re.compile(
+    r"[.\-]([0-9a-f]{8,32}|[A-Za-z0-9_-]{8})\.(?:m?js|css|wasm|woff2?|ttf|png|svg|webp)$"
+)
+# The body is handed over decoded, so transport headers no longer apply
+TRANSPORT_HEADERS: frozenset[str] = frozenset(
+    ("content-encoding", "content-length", "transfer-encoding")
+)
+DROPPED_HEADERS: frozenset[str] = TRANSPORT_HEADERS | {"set-cookie"}
+
+
+MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+def immutable(url: str) -> bool:
+    # Heuristic, so words like chunk123 or Settings are not taken for
+    # hashes: hex needs letters and digits, Vite hashes need a digit and
+    # both letter cases. Anything it misses can be listed in the "urls"
+    # globs instead
+    match = HASHED.search(urlsplit(url).path)
+    if match is None:
+        return False
+    name = match.group(1)
+    if not any(c.isdigit() for c in name):
+        return False
+    if re.fullmatch(r"[0-9a-f]+", name):
+        return any(c.isalpha() for c in name)
+    return any(c.isupper() for c in name) and any(c.islower() for c in name)
+
+
+def lasting(
+    headers: dict[str, str],
+    min_age: float
+) -> bool:
+    # The server has to agree the response never changes under its url
+    cache_control = headers.get("cache-control", "").lower()
+    if "immutable" in cache_control:
+        return True
+    match = MAX_AGE.search(cache_control)
+    return match is not None and int(match.group(1)) >= min_age
+
+
+class AssetCache:
+    def __init__(
+        self,
+        directory: str = ASSETS_DIR,
+        max_size: float = 512,
+        urls: list[str] | None = None,
+        min_age: float = 7 * 86400
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = int(max_size * 2**20)
+        self.min_age = min_age
+        self.urls = re.compile(
+            "|".join(translate(url) for url in urls)
+        ) if urls else None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.served_bytes: int = 0
+        self.evicted: int = 0
+        # Concurrent misses for one url share a single download
+        self._fetches = SharedCache(ttl=0)
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "urls"), exist_ok=True)
+        self.size: int = sum(
+            entry.stat().st_size
+            for entry in os.scandir(os.path.join(directory, "objects"))
+            if not entry.name.endswith(".tmp")
+        )
+
+    def listed(self, url: str) -> bool:
+        return bool(self.urls and self.urls.match(url))
+
+    def cacheable(self, url: str) -> bool:
+        return self.listed(url) or immutable(url)
+
+    def storable(
+        self,
+        url: str,
+        headers: dict[str, str]
+    ) -> bool:
+        # Listed urls are cached regardless of what the server says
+        return self.listed(url) or lasting(headers, self.min_age)
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", sha256(url.encode()).hexdigest())
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest)
+
+    def load(self, url: str) -> tuple[dict[str, str], bytes] | None:
+        try:
+            with open(self._meta_path(url), "r") as f:
+                meta = json.load(f)
+            path = self._object_path(meta["digest"])
+            with open(path, "rb") as f:
+                body = f.read()
+            # Modification time doubles as the last use for eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta["headers"], body
+
+    def _temporary(self, folder: str) -> tuple[int, str]:
+        # Unique names, as other profiles and shards write the same assets
+        return mkstemp(
+            dir=os.path.join(self.directory, folder),
+            prefix=".",
+            suffix=".tmp"
+        )
+
+    def store(
+        self,
+        url: str,
+        headers: dict[str, str],
+        body: bytes
+    ) -> None:
+        # Objects are named by content, so assets shared by several urls
+        # are stored once
+        digest = sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            fd, temporary = self._temporary("objects")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            try:
+                # Linking fails if another writer got there first,
+                # so the object is counted once
+                os.link(temporary, path)
+                self.size += len(body)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(temporary)
+        meta_path = self._meta_path(url)
+        fd, temporary = self._temporary("urls")
+        with os.fdopen(fd, "w") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "digest": digest,
+                    "headers": {
+                        name: value
+                        for name, value in headers.items()
+                        if name.lower() not in DROPPED_HEADERS
+                    }
+                },
+                f
+            )
+        os.replace(temporary, meta_path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        # Least recently used objects go first, down to 90% of the limit
+        objects = sorted(
+            os.scandir(os.path.join(self.directory, "objects")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in objects:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self.size -= size
+            self.evicted += 1
+        # Url entries of evicted objects are dropped by load() misses
+
+    async def _fetch(self, route: Route) -> tuple[int, dict[str, str], bytes]:
+        response = await route.fetch()
+        body = await response.body()
+        if response.status == 200 and self.storable(route.request.url, response.headers):
+            try:
+                await asyncio.to_thread(
+                    self.store,
+                    route.request.url,
+                    response.headers,
+                    body
+                )
+            except OSError as e:
+                # The request is still answered, only caching is skipped
+                logger.warning(f"Asset not cached: {e}")
+        return (
+            response.status,
+            {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in TRANSPORT_HEADERS
+            },
+            body
+        )
+
+    async def install(self, context: BrowserContext) -> None:
+        async def route(route: Route) -> None:
+            request = route.request
+            try:
+                if request.method != "GET" or not self.cacheable(request.url):
+                    await route.fallback()
+                    return
+                cached = await asyncio.to_thread(self.load, request.url)
+                if cached:
+                    headers, body = cached
+                    self.hits += 1
+                    self.served_bytes += len(body)
+                    await route.fulfill(
+                        status=200,
+                        headers=headers,
+                        body=body
+                    )
+                    return
+                self.misses += 1
+                try:
+                    status, headers, body = await self._fetches.get(
+                        request.url,
+                        lambda: self._fetch(route)
+                    )
+                except Error:
+                    # The shared download may belong to a closed context
+                    await route.fallback()
+                    return
+                await route.fulfill(
+                    status=status,
+                    headers=headers,
+                    body=body
+                )
+            except Error:
+                pass
+
+        await context.route("**/*", route)
+
+    def stats(self) -> dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            "served_mib": round(self.served_bytes / 2**20, 1),
+            "size_mib": round(self.size / 2**20, 1),
+            "evicted": self.evicted
+        }
@@ -1,11 +1,27 @@
 import os
 import json
 import asyncio
+from time import perf_counter, time
+from functools import wraps
 from typing import Any, Callable, Iterable
-from math import ceil
 from playwright.async_api import Playwright, Error
 from playwright.async_api import async_playwright
-from src.core.utils import logger
+from src.core.utils import logger, add_sink
+from src.forgery.scheduler import Scheduler
+from src.forgery.governor import Governor
+from src.forgery.metrics import Metrics, METRICS_DIR, span
+from src.forgery.routing import RequestFilter, Traffic
+from src.forgery.assets import AssetCache
+from src.forgery.profiles import ProfileStore, open_store
+from src.forgery.journal import Journal, JOURNAL_DIR
+from src.forgery.health import classify, preflight
+from src.forgery.sharding import Shard, ShardPool
+from src.forgery import tracing, planning
+from src.forgery.maintenance import default_user_data_dir, enforce
+
+
+# Undecorated scripts by package, so pipelines can chain them in one context
+SCRIPTS: dict[str, Callable] = {}
 
 
 def execute_chromium(
@@ -13,18 +29,45 @@ def execute_chromium(
     config: str | dict[str, Any]
 ) -> None:
     def decorator(script: Callable):
-        async def wrapper():
-            USER: str = os.getlogin()
-            assert USER
+        SCRIPTS[script.__module__.removesuffix(".__main__")] = script
+
+        @wraps(script)
+        async def wrapper(
+            playwright: Playwright | None = None,
+            shard: Shard | None = None
+        ) -> None:
             async def execute(
                 playwright: Playwright,
                 profile: dict[str, Any],
+                user_data_dir: str,
                 headless: bool | None,
                 extensions: Iterable[str] | None,
                 use_wayland: bool | None,
                 device_model: str | None,
-                devtools: bool | None
-            ) -> None:
+                devtools: bool | None,
+                metrics: Metrics,
+                request_filter: RequestFilter | None,
+                asset_cache: AssetCache | None,
+                log_options: dict[str, Any],
+                trace_options: dict[str, Any] | None
+            ) -> tuple[str, str | None]:
+                metrics.bind(profile["id"])
+                tracing.enabled.set(trace_options is not None)
+                recording: bool = False
+                sink: int | None = None
+                if log_options.get("per_profile"):
+                    # Sinks are added and removed off the loop: removal
+                    # flushes and compresses the file while holding
+                    # loguru's lock, which adding another sink waits for
+                    sink = await asyncio.to_thread(
+                        add_sink,
+                        log_options["per_profile"].format(id=profile["id"]),
+                        log_options,
+                        filter=lambda record: (
+                            record["extra"]["id"] == profile["id"]
+                            and record["extra"]["run"] == metrics.name
+                        )
+                    )
                 proxy: dict | None = None
                 device: dict = {}
                 if profile.get("proxy"):
@@ -55,43 +98,77 @@ def execute_chromium(
                         )
                     args.append(disabled_extensions.removesuffix(","))
                 if device_model:
-                    device = playwright.devices[device_model]
+                    device = dict(playwright.devices[device_model])
                     device.pop("default_browser_type")
-                profile_path: str = f"/home/{USER}/.config/chromium/{profile['id']}"
+                profile_path: str = os.path.join(user_data_dir, profile["id"])
+                started: float = perf_counter()
+                status: str = "cancelled"
+                reason: str | None = None
+                traffic: Traffic | None = None
                 try:
-                    context = await playwright.chromium.launch_persistent_context(
-                        profile_path,
-                        ignore_default_args=(
-                            "--enable-automation",
-                            # "--remote-debugging-pipe"
-                            # allows to bypass CDP detection,
-                            # but breaks playwright functionality
-                        ),
-                        proxy=proxy,
-                        devtools=devtools,
-                        service_workers="block",
-                        headless=headless,
-                        args=args,
-                        **device
-                    )
+                    with span("launch"):
+                        context = await playwright.chromium.launch_persistent_context(
+                            profile_path,
+                            ignore_default_args=(
+                                "--enable-automation",
+                                # "--remote-debugging-pipe"
+                                # allows to bypass CDP detection,
+                                # but breaks playwright functionality
+                            ),
+                            proxy=proxy,
+                            devtools=devtools,
+                            service_workers="block",
+                            headless=headless,
+                            args=args,
+                            **device
+                        )
                     logger.info(
                         "Context launched",
                         id=profile["id"]
                     )
+                    # The filter is routed last so it sees requests before the cache
+                    if asset_cache:
+                        await asset_cache.install(context)
+                    if request_filter:
+                        traffic = await request_filter.install(context)
+                    if trace_options and trace_options.get("threshold") is not None:
+                        await context.tracing.start(
+                            screenshots=True,
+                            snapshots=True
+                        )
+                        recording = True
                     # await context.add_init_script(
                     #     "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
                     # )
-                    await script(context, profile, logger)
+                    with span("script"):
+                        await script(context, profile, logger)
+                    status = "success"
                 except Exception as e:
+                    status = "failure"
+                    reason = classify(e)
                     logger.error(
-                        str(e) + "!",
+                        f"{reason.capitalize()} failure: {e}!",
                         id=profile["id"]
                     )
                 finally:
                     msg: str
                     try:
-                        await context.unroute_all(behavior='ignoreErrors')
-                        await context.close()
+                        with span("close"):
+                            if recording:
+                                # Only slow profiles keep their trace
+                                trace: str | None = None
+                                if perf_counter() - started > trace_options["threshold"]:
+                                    trace = os.path.join(
+                                        trace_options.get("directory", tracing.TRACES_DIR),
+                                        f"{metrics.name}-{profile['id']}.zip"
+                                    )
+                                    logger.warning(
+                                        f"Slow profile, trace saved to {trace}",
+                                        id=profile["id"]
+                                    )
+                                await context.tracing.stop(path=trace)
+                            await context.unroute_all(behavior='ignoreErrors')
+                            await context.close()
                         msg = "Context closed"
                     except (UnboundLocalError, Error):
                         msg = "Context already closed"
@@ -99,65 +176,295 @@ def execute_chromium(
                         msg,
                         id=profile["id"]
                     )
+                    if traffic:
+                        traffic.report(profile["id"])
+                    metrics.record(
+                        profile["id"],
+                        "profile",
+                        perf_counter() - started,
+                        status
+                    )
+                    if sink is not None:
+                        await asyncio.to_thread(logger.remove, sink)
+                return status, reason
 
-            async with async_playwright() as playwright:
-                profiles_obj: list[dict[str, Any]]
+            async def run(
+                playwright: Playwright | None
+            ) -> None:
                 config_obj: dict[str, Any]
-                if profiles:
-                    with open(profiles, "r") as f:
-                        profiles_obj = json.load(f)
                 if isinstance(config, str):
                     with open(config, "r") as f:
                         config_obj = json.load(f)
                 elif isinstance(config, dict):
-                    config_obj = config
-                if not config_obj.get("profile_ids"):
-                    config_obj["profile_ids"] = [
-                        profile["id"]
-                        for profile 
-                        in profiles_obj
-                    ]
-                if not config_obj.get("exclude_profile_ids"):
-                    config_obj["exclude_profile_ids"] = []
-
-                async def process_threaded_batch(
-                    batch: list[dict[str, Any]],
-                    **kwargs
-                ) -> None:
-                    for profile in batch:
-                        await execute(
-                            profile=profile,
-                            **kwargs
+                    config_obj = dict(config)
+                store: ProfileStore = open_store(profiles)
+                name: str = (
+                    config_obj.get("name")
+                    or (
+                        os.path.dirname(config).replace(os.sep, ".")
+                        if isinstance(config, str)
+                        else script.__name__
+                    )
+                )
+                # Shards run what the parent hands them and report back,
+                # selection, the journal and sinks stay with the parent
+                processes: int = 1 if shard else config_obj.get("processes", 1)
+                selected: dict[str, float] = {}
+                journal: Journal | None = None
+                if shard is None:
+                    selected = store.select(
+                        include=config_obj.get("profile_ids"),
+                        exclude=config_obj.get("exclude_profile_ids"),
+                        tags=config_obj.get("tags"),
+                        groups=config_obj.get("groups")
+                    )
+                    journal = Journal(
+                        os.path.join(
+                            config_obj.get("journal_dir", JOURNAL_DIR),
+                            f"{name}.jsonl"
+                        )
+                    )
+                if journal and config_obj.get("resume_window"):
+                    completed: set[str] = journal.completed(config_obj["resume_window"])
+                    skipped: int = len(selected)
+                    selected = {
+                        profile_id: priority
+                        for profile_id, priority in selected.items()
+                        if profile_id not in completed
+                    }
+                    skipped -= len(selected)
+                    if skipped:
+                        logger.info(
+                            f"Skipping {skipped} profiles completed "
+                            f"within the last {config_obj['resume_window']}s"
+                        )
+                dues: dict[str, float] = {}
+                if journal and config_obj.get("schedule"):
+                    # Profiles are launched once they are expected to pay off,
+                    # those not due within the horizon are left for a later run
+                    schedule: dict[str, Any] = dict(config_obj["schedule"])
+                    horizon: float = schedule.pop("horizon", 0)
+                    now: float = time()
+                    for profile_id in selected:
+                        entry = journal.entries.get(profile_id)
+                        dues[profile_id] = planning.due(
+                            entry and entry.get("state"),
+                            **schedule
+                        )
+                    deferred: dict[str, float] = {
+                        profile_id: when
+                        for profile_id, when in dues.items()
+                        if when > now + horizon
+                    }
+                    if deferred:
+                        selected = {
+                            profile_id: priority
+                            for profile_id, priority in selected.items()
+                            if profile_id not in deferred
+                        }
+                        logger.info(
+                            f"Deferring {len(deferred)} profiles without enough payoff, "
+                            f"next due in {min(deferred.values()) - now:.0f}s"
+                        )
+                priorities: dict[str, float] = config_obj.get("priorities", {})
+                governor: Governor | None = None
+                if config_obj.get("adaptive"):
+                    governor = Governor(
+                        maximum=config_obj["threads"],
+                        **(
+                            config_obj["adaptive"]
+                            if isinstance(config_obj["adaptive"], dict)
+                            else {}
+                        )
+                    )
+                scheduler = Scheduler(
+                    workers=config_obj["threads"],
+                    deadline=config_obj.get("deadline"),
+                    governor=governor,
+                    feed=shard.next if shard else None
+                )
+                if journal and config_obj.get("preflight"):
+                    preflight_options: dict[str, Any] = (
+                        config_obj["preflight"]
+                        if isinstance(config_obj["preflight"], dict)
+                        else {}
+                    )
+                    proxies: dict[str, dict[str, Any]] = {}
+                    for profile_id in selected:
+                        proxy = store.load(profile_id).get("proxy")
+                        if proxy:
+                            proxies[profile_id] = proxy
+                    dead: dict[str, str] = await preflight(
+                        proxies,
+                        **preflight_options
+                    )
+                    for profile_id, result in dead.items():
+                        logger.warning(
+                            f"Proxy {result}, skipped",
+                            id=profile_id
+                        )
+                        selected.pop(profile_id)
+                        journal.record(profile_id, "failure", "proxy")
+                    logger.info(
+                        f"Pre-flight: {len(proxies) - len(dead)}/{len(proxies)} proxies alive"
+                    )
+                for profile_id, priority in selected.items():
+                    scheduler.put(
+                        profile_id,
+                        priority=priorities.get(profile_id, priority),
+                        due=dues.get(profile_id, 0)
+                    )
+
+                metrics = Metrics(
+                    name=name,
+                    threads=scheduler.workers * processes
+                )
+
+                user_data_dir: str = config_obj.get("user_data_dir") or default_user_data_dir()
+                if shard is None and config_obj.get("maintenance"):
+                    # Caches are pruned before any context of the batch is open
+                    await enforce(
+                        user_data_dir,
+                        [
+                            profile_id
+                            for profile_id in selected
+                            if os.path.isdir(os.path.join(user_data_dir, profile_id))
+                        ],
+                        **config_obj["maintenance"]
+                    )
+
+                log_options: dict[str, Any] = config_obj.get("logging", {})
+                sinks: list[int] = []
+                if shard is None and log_options.get("file"):
+                    sinks.append(
+                        add_sink(
+                            log_options["file"],
+                            log_options,
+                            filter=lambda record: record["extra"]["run"] == metrics.name
                         )
+                    )
+
+                request_filter: RequestFilter | None = None
+                if config_obj.get("requests"):
+                    request_filter = RequestFilter(**config_obj["requests"])
+
+                asset_cache: AssetCache | None = None
+                if config_obj.get("assets"):
+                    asset_cache = AssetCache(
+                        **(
+                            config_obj["assets"]
+                            if isinstance(config_obj["assets"], dict)
+                            else {}
+                        )
+                    )
 
-                batch_tasks: list = []
-                included_profiles: list[dict[str, Any]] = [
-                    profile
-                    for profile in profiles_obj
-                    if (
-                        profile["id"] in config_obj["profile_ids"]
-                        and not profile["id"] in config_obj["exclude_profile_ids"]
+                trace_options: dict[str, Any] | None = None
+                if config_obj.get("tracing"):
+                    trace_options = (
+                        config_obj["tracing"]
+                        if isinstance(config_obj["tracing"], dict)
+                        else {}
                     )
-                ]
-                for threaded_batch in [
-                    included_profiles[i::config_obj["threads"]]
-                    for i in range(config_obj["threads"])
-                ]:
-                    batch_tasks.append(
-                        asyncio.create_task(
-                            process_threaded_batch(
-                                threaded_batch,
+                    tracing.install()
+
+                retries: dict[str, int] = config_obj.get("retries", {})
+                backoff: float = config_obj.get("backoff", 5)
+
+                async def process(profile_id: str) -> None:
+                    status: str = "cancelled"
+                    reason: str | None = None
+                    profile: dict[str, Any] = store.load(profile_id)
+                    state: dict[str, Any] = planning.bind()
+                    attempt: int = 0
+                    try:
+                        while True:
+                            status, reason = await execute(
                                 playwright=playwright,
+                                profile=profile,
+                                user_data_dir=user_data_dir,
                                 headless=config_obj.get("headless"),
                                 extensions=config_obj.get("extensions"),
                                 use_wayland=config_obj.get("use_wayland"),
                                 device_model=config_obj.get("device_model"),
-                                devtools=config_obj.get("devtools")
+                                devtools=config_obj.get("devtools"),
+                                metrics=metrics,
+                                request_filter=request_filter,
+                                asset_cache=asset_cache,
+                                log_options=log_options,
+                                trace_options=trace_options
                             )
-                        )
-                    )
-                if batch_tasks:
-                    await asyncio.gather(*batch_tasks)
+                            if (
+                                status != "failure"
+                                or attempt >= retries.get(reason, 0)
+                            ):
+                                break
+                            delay: float = backoff * 2**attempt
+                            attempt += 1
+                            logger.warning(
+                                f"Retry {attempt} after {reason} failure in {delay:.0f}s",
+                                id=profile_id
+                            )
+                            await asyncio.sleep(delay)
+                    finally:
+                        # Only successes are skipped on resume, a kill leaves no entry
+                        if shard:
+                            shard.send("result", profile_id, status, reason, state)
+                        else:
+                            journal.record(profile_id, status, reason, state)
+
+                def collect(
+                    kind: str,
+                    index: int,
+                    payload: list[Any]
+                ) -> None:
+                    if kind == "result":
+                        journal.record(*payload)
+                    elif kind == "metrics":
+                        records, notes = payload
+                        metrics.records.extend(records)
+                        for key, value in notes.items():
+                            metrics.notes[f"Shard {index}: {key}"] = value
+
+                with logger.contextualize(run=metrics.name):
+                    try:
+                        if processes > 1:
+                            await ShardPool(processes).run(
+                                target=wrapper,
+                                items=scheduler.drain(),
+                                workers=scheduler.workers,
+                                handle=collect
+                            )
+                        elif playwright is None:
+                            async with async_playwright() as playwright:
+                                await scheduler.run(process)
+                        else:
+                            await scheduler.run(process)
+                    finally:
+                        store.close()
+                        if asset_cache and processes == 1:
+                            metrics.notes["Asset cache"] = asset_cache.stats()
+                        if shard:
+                            scheduler.report()
+                            shard.send("metrics", metrics.records, metrics.notes)
+                        else:
+                            journal.close()
+                            metrics.finish()
+                            if processes == 1:
+                                scheduler.report()
+                            metrics.summary()
+                            metrics.export(
+                                config_obj.get("metrics_dir", METRICS_DIR)
+                            )
+                            if trace_options is not None:
+                                tracing.report(
+                                    metrics,
+                                    config_obj.get("metrics_dir", METRICS_DIR),
+                                    top=trace_options.get("top", 15)
+                                )
+                        for sink in sinks:
+                            await asyncio.to_thread(logger.remove, sink)
+
+            await run(playwright)
 
         return wrapper
 
@@ -0,0 +1,49 @@
+import asyncio
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SharedCache:
+    def __init__(
+        self,
+        ttl: float | None = None
+    ) -> None:
+        self.ttl = ttl
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._pending: dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None = None
+    ) -> Any:
+        entry = self._entries.get(key)
+        if entry and entry[0] > monotonic():
+            return entry[1]
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load(key, loader, self.ttl if ttl is None else ttl)
+            )
+            self._pending[key] = task
+        # A cancelled waiter must not cancel the load the others wait for
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None
+    ) -> Any:
+        try:
+            value = await loader()
+            # A ttl of 0 only shares the load between concurrent callers
+            if ttl != 0:
+                self._entries[key] = (
+                    float("inf") if ttl is None else monotonic() + ttl,
+                    value
+                )
+            return value
+        finally:
+            self._pending.pop(key, None)
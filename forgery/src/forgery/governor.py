@@ -0,0 +1,95 @@
+import os
+import asyncio
+from src.core.utils import logger
+from src.forgery.resources import memory, cpu_times, descendants, rss
+
+
+class Governor:
+    def __init__(
+        self,
+        maximum: int,
+        min_memory: float = 0.2,
+        min_cpu: float = 0.1,
+        max_children_memory: float | None = None,
+        interval: float = 1.0
+    ) -> None:
+        self.maximum = max(maximum, 1)
+        self.min_memory = min_memory
+        self.min_cpu = min_cpu
+        self.max_children_memory = max_children_memory
+        self.interval = interval
+        self.limit: int = 1
+        self.active: int = 0
+        self._changed = asyncio.Condition()
+        self._cpu: tuple[int, int] = cpu_times()
+        self._held: str | None = None
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self) -> None:
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    def sample(self) -> tuple[float, float, int, int]:
+        available, total = memory()
+        idle, ticks = cpu_times()
+        previous_idle, previous_ticks = self._cpu
+        self._cpu = (idle, ticks)
+        cpu_idle = (idle - previous_idle) / max(ticks - previous_ticks, 1)
+        children = sum(rss(pid) for pid in descendants(os.getpid()))
+        return available / total, cpu_idle, children, total
+
+    def decide(
+        self,
+        memory_free: float,
+        cpu_idle: float,
+        children: int,
+        total: int
+    ) -> tuple[int, str | None]:
+        # Each running context is assumed to need what the average one holds now
+        per_context = children / self.active if self.active else 0
+        if memory_free < self.min_memory:
+            reason = f"memory below {self.min_memory:.0%}"
+        elif cpu_idle < self.min_cpu:
+            reason = f"CPU idle below {self.min_cpu:.0%}"
+        elif (
+            self.max_children_memory
+            and children > self.max_children_memory * total
+        ):
+            reason = f"browsers above {self.max_children_memory:.0%} of memory"
+        else:
+            reason = None
+        if reason:
+            return max(self.limit - 1, 1), reason
+        if self.active < self.limit or self.limit >= self.maximum:
+            return self.limit, None
+        if memory_free - per_context / total < self.min_memory:
+            return self.limit, "no memory headroom for another context"
+        return self.limit + 1, None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            memory_free, cpu_idle, children, total = await asyncio.to_thread(
+                self.sample
+            )
+            limit, reason = self.decide(memory_free, cpu_idle, children, total)
+            readings = (
+                f"memory {memory_free:.0%} free, CPU {cpu_idle:.0%} idle, "
+                f"browsers {children / 2**20:.0f} MiB, {self.active} active"
+            )
+            if limit != self.limit:
+                logger.info(
+                    f"{'Scaling up' if limit > self.limit else 'Backing off'} "
+                    f"to {limit}" + (f" ({reason})" if reason else "") + f": {readings}"
+                )
+                async with self._changed:
+                    self.limit = limit
+                    self._changed.notify_all()
+            elif reason and reason != self._held:
+                logger.info(f"Holding at {self.limit} ({reason}): {readings}")
+            self._held = reason
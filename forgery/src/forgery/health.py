@@ -0,0 +1,98 @@
+import asyncio
+from base64 import b64encode
+from urllib.parse import urlsplit
+from typing import Any
+
+
+PROXY_ERRORS: tuple[str, ...] = (
+    "ERR_PROXY",
+    "ERR_TUNNEL_CONNECTION_FAILED",
+    "ERR_SOCKS",
+    "ERR_NO_SUPPORTED_PROXIES",
+    "407"
+)
+NAVIGATION_ERRORS: tuple[str, ...] = (
+    "net::ERR_",
+    "goto",
+    "navigating to",
+    "Navigation"
+)
+
+
+def classify(error: BaseException) -> str:
+    message = str(error)
+    if any(marker in message for marker in PROXY_ERRORS):
+        return "proxy"
+    if any(marker in message for marker in NAVIGATION_ERRORS):
+        return "navigation"
+    return "script"
+
+
+async def check_proxy(
+    proxy: dict[str, Any],
+    target: str = "web.telegram.org:443",
+    timeout: float = 10
+) -> str | None:
+    server: str = proxy["server"]
+    parts = urlsplit(server if "://" in server else f"http://{server}")
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port),
+            timeout
+        )
+    except (OSError, TimeoutError) as e:
+        return f"unreachable ({str(e) or 'timeout'})"
+    try:
+        if not parts.scheme.startswith("http"):
+            # Only the TCP handshake is checked for SOCKS proxies
+            return None
+        request = f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n"
+        if proxy.get("username"):
+            credentials = b64encode(
+                f"{proxy['username']}:{proxy.get('password', '')}".encode()
+            ).decode()
+            request += f"Proxy-Authorization: Basic {credentials}\r\n"
+        writer.write((request + "\r\n").encode())
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        fields = line.split()
+        if len(fields) < 2 or fields[1] != b"200":
+            return f"CONNECT answered {line.decode(errors='replace').strip() or 'nothing'}"
+        return None
+    except (OSError, TimeoutError) as e:
+        return f"CONNECT failed ({str(e) or 'timeout'})"
+    finally:
+        writer.close()
+
+
+async def preflight(
+    proxies: dict[str, dict[str, Any]],
+    target: str = "web.telegram.org:443",
+    timeout: float = 10,
+    concurrency: int = 32
+) -> dict[str, str]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(proxy: dict[str, Any]) -> str | None:
+        async with semaphore:
+            return await check_proxy(proxy, target, timeout)
+
+    # Profiles sharing a proxy share one check
+    unique: dict[tuple, dict[str, Any]] = {}
+    for proxy in proxies.values():
+        unique.setdefault(
+            (proxy["server"], proxy.get("username"), proxy.get("password")),
+            proxy
+        )
+    results = dict(
+        zip(
+            unique,
+            await asyncio.gather(*(check(proxy) for proxy in unique.values()))
+        )
+    )
+    failures: dict[str, str] = {}
+    for profile_id, proxy in proxies.items():
+        result = results[(proxy["server"], proxy.get("username"), proxy.get("password"))]
+        if result is not None:
+            failures[profile_id] = result
+    return failures
@@ -0,0 +1,60 @@
+import os
+import json
+from time import time
+from typing import Any
+
+
+JOURNAL_DIR: str = ".cache/forgery/journal"
+
+
+class Journal:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a killed process
+                        continue
+                    self.entries[entry["id"]] = entry
+        # Keep only the latest outcome per profile so the file stays small
+        with open(path + ".tmp", "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(path + ".tmp", path)
+        self._file = open(path, "a")
+
+    def completed(self, window: float) -> set[str]:
+        since = time() - window
+        return {
+            profile_id
+            for profile_id, entry in self.entries.items()
+            if entry["status"] == "success" and entry["time"] >= since
+        }
+
+    def record(
+        self,
+        profile_id: str,
+        status: str,
+        reason: str | None = None,
+        state: dict[str, Any] | None = None
+    ) -> None:
+        # Observations of earlier runs stay until a newer run replaces them
+        previous = self.entries.get(profile_id, {}).get("state", {})
+        entry = {
+            "id": profile_id,
+            "status": status,
+            "reason": reason,
+            "state": {**previous, **(state or {})},
+            "time": time()
+        }
+        self.entries[profile_id] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import asyncio
+from typing import Callable, Iterable
+from src.core.utils import logger
+
+
+# Caches Chromium rebuilds on its own, cookies, Local Storage and
+# IndexedDB (where the login state lives) are never touched
+DISPOSABLE: tuple[str, ...] = (
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/DawnCache",
+    "Default/DawnGraphiteCache",
+    "Default/DawnWebGPUCache",
+    "Default/Service Worker/CacheStorage",
+    "Default/Service Worker/ScriptCache",
+    "GrShaderCache",
+    "GraphiteDawnCache",
+    "ShaderCache",
+    "Crashpad",
+    "component_crx_cache",
+    "extensions_crx_cache"
+)
+
+
+def default_user_data_dir() -> str:
+    USER: str = os.getlogin()
+    assert USER
+    return f"/home/{USER}/.config/chromium"
+
+
+def usage(path: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def prune(path: str) -> int:
+    freed = 0
+    for name in DISPOSABLE:
+        target = os.path.join(path, name)
+        if os.path.isdir(target):
+            freed += usage(target)
+            shutil.rmtree(target, ignore_errors=True)
+    return freed
+
+
+def prunable(path: str) -> int:
+    return sum(
+        usage(os.path.join(path, name))
+        for name in DISPOSABLE
+        if os.path.isdir(os.path.join(path, name))
+    )
+
+
+async def _each(
+    function: Callable[[str], int],
+    user_data_dir: str,
+    profile_ids: Iterable[str],
+    concurrency: int
+) -> dict[str, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(profile_id: str) -> int:
+        async with semaphore:
+            return await asyncio.to_thread(
+                function,
+                os.path.join(user_data_dir, profile_id)
+            )
+
+    profile_ids = list(profile_ids)
+    return dict(
+        zip(
+            profile_ids,
+            await asyncio.gather(*(run(profile_id) for profile_id in profile_ids))
+        )
+    )
+
+
+async def survey(
+    user_data_dir: str,
+    profile_ids: Iterable[str] | None = None,
+    concurrency: int = 8
+) -> dict[str, int]:
+    if profile_ids is None:
+        profile_ids = [
+            entry.name
+            for entry in os.scandir(user_data_dir)
+            if entry.is_dir()
+        ]
+    return await _each(usage, user_data_dir, profile_ids, concurrency)
+
+
+async def compact(
+    user_data_dir: str,
+    profile_ids: Iterable[str],
+    concurrency: int = 8
+) -> dict[str, int]:
+    return await _each(prune, user_data_dir, profile_ids, concurrency)
+
+
+async def enforce(
+    user_data_dir: str,
+    profile_ids: Iterable[str],
+    budget: float,
+    concurrency: int = 8
+) -> int:
+    # Profiles with the most cache are pruned first until the total fits
+    # in the budget (MiB), only cache directories count as reclaimable
+    profile_ids = list(profile_ids)
+    sizes = await survey(user_data_dir, profile_ids, concurrency)
+    total = sum(sizes.values())
+    limit = budget * 2**20
+    if total <= limit:
+        return 0
+    caches = await _each(prunable, user_data_dir, profile_ids, concurrency)
+    chosen: list[str] = []
+    for profile_id in sorted(caches, key=caches.get, reverse=True):
+        if total <= limit or not caches[profile_id]:
+            break
+        chosen.append(profile_id)
+        total -= caches[profile_id]
+    freed = sum((await compact(user_data_dir, chosen, concurrency)).values())
+    logger.info(
+        f"Profiles over their {budget:g} MiB budget, pruned caches of "
+        f"{len(chosen)} profiles and freed {freed / 2**20:.1f} MiB"
+    )
+    if total > limit:
+        logger.warning(
+            f"Profiles still take {total / 2**20:.1f} MiB without caches, "
+            f"over the {budget:g} MiB budget"
+        )
+    return freed
@@ -0,0 +1,212 @@
+import os
+import json
+from time import time, perf_counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from src.core.utils import logger
+
+
+METRICS_DIR: str = ".cache/forgery/metrics"
+current: ContextVar[tuple["Metrics", str] | None] = ContextVar(
+    "metrics",
+    default=None
+)
+
+
+def percentile(
+    values: list[float],
+    q: float
+) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Metrics:
+    def __init__(
+        self,
+        name: str,
+        threads: int
+    ) -> None:
+        self.name = name
+        self.threads = threads
+        self.started: float = time()
+        self.elapsed: float = 0.0
+        self.records: list[dict[str, Any]] = []
+        self.notes: dict[str, Any] = {}
+        self._clock: float = perf_counter()
+
+    def record(
+        self,
+        profile_id: str,
+        phase: str,
+        duration: float,
+        status: str = "success",
+        **labels
+    ) -> None:
+        self.records.append(
+            {
+                "run": self.name,
+                "started": self.started,
+                "id": profile_id,
+                "phase": phase,
+                "status": status,
+                "duration": duration,
+                **labels
+            }
+        )
+
+    @contextmanager
+    def span(
+        self,
+        profile_id: str,
+        phase: str,
+        **labels
+    ) -> Iterator[None]:
+        started = perf_counter()
+        status = "success"
+        try:
+            yield
+        except BaseException:
+            status = "failure"
+            raise
+        finally:
+            self.record(
+                profile_id,
+                phase,
+                perf_counter() - started,
+                status,
+                **labels
+            )
+
+    def bind(self, profile_id: str) -> None:
+        current.set((self, profile_id))
+
+    def finish(self) -> None:
+        self.elapsed = perf_counter() - self._clock
+
+    def phases(self) -> dict[tuple[str, str], list[float]]:
+        phases: dict[tuple[str, str], list[float]] = {}
+        for record in self.records:
+            # Steps have their own report, see tracing.report()
+            if record["phase"] == "step":
+                continue
+            phases.setdefault(
+                (record["phase"], record["status"]),
+                []
+            ).append(record["duration"])
+        return phases
+
+    def summary(self) -> None:
+        profiles = sum(
+            1 for record in self.records
+            if record["phase"] == "profile"
+        )
+        rate = profiles / self.elapsed * 60 if self.elapsed else 0.0
+        logger.info(
+            f"{self.name}: {profiles} profiles in {self.elapsed:.1f}s "
+            f"with {self.threads} threads, {rate:.1f} profiles/min"
+        )
+        for (phase, status), durations in sorted(self.phases().items()):
+            logger.info(
+                f"{phase} ({status}, {len(durations)}): "
+                f"p50 {percentile(durations, 0.5):.2f}s, "
+                f"p95 {percentile(durations, 0.95):.2f}s, "
+                f"max {max(durations):.2f}s"
+            )
+        for key, value in self.notes.items():
+            logger.info(f"{key}: {value}")
+
+    def write_jsonl(self, path: str) -> None:
+        with open(path, "a") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+            f.write(
+                json.dumps(
+                    {
+                        "run": self.name,
+                        "started": self.started,
+                        "phase": "run",
+                        "threads": self.threads,
+                        "duration": self.elapsed,
+                        "notes": self.notes
+                    }
+                ) + "\n"
+            )
+
+    def write_prometheus(self, path: str) -> None:
+        lines: list[str] = [
+            "# HELP forgery_phase_seconds Duration of profile phases.",
+            "# TYPE forgery_phase_seconds summary"
+        ]
+        for (phase, status), durations in sorted(self.phases().items()):
+            labels = f'script="{self.name}",phase="{phase}",status="{status}"'
+            for q in (0.5, 0.95, 1.0):
+                lines.append(
+                    f'forgery_phase_seconds{{{labels},quantile="{q}"}} '
+                    f"{percentile(durations, q)}"
+                )
+            lines.append(f"forgery_phase_seconds_sum{{{labels}}} {sum(durations)}")
+            lines.append(f"forgery_phase_seconds_count{{{labels}}} {len(durations)}")
+        lines += [
+            "# HELP forgery_run_seconds Wall time of the last run.",
+            "# TYPE forgery_run_seconds gauge",
+            f'forgery_run_seconds{{script="{self.name}"}} {self.elapsed}',
+            "# HELP forgery_run_threads Threads of the last run.",
+            "# TYPE forgery_run_threads gauge",
+            f'forgery_run_threads{{script="{self.name}"}} {self.threads}',
+            "# HELP forgery_run_timestamp_seconds Start time of the last run.",
+            "# TYPE forgery_run_timestamp_seconds gauge",
+            f'forgery_run_timestamp_seconds{{script="{self.name}"}} {self.started}'
+        ]
+        # The textfile collector may read at any time, so replace atomically
+        with open(path + ".tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+
+    def export(self, directory: str = METRICS_DIR) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.write_jsonl(os.path.join(directory, f"{self.name}.jsonl"))
+        self.write_prometheus(os.path.join(directory, f"{self.name}.prom"))
+
+
+@contextmanager
+def span(
+    phase: str,
+    **labels
+) -> Iterator[None]:
+    bound = current.get()
+    with logger.contextualize(phase=phase):
+        if bound is None:
+            yield
+            return
+        metrics, profile_id = bound
+        with metrics.span(profile_id, phase, **labels):
+            yield
+
+
+def record(
+    phase: str,
+    duration: float,
+    status: str = "success",
+    **labels
+) -> None:
+    bound = current.get()
+    if bound is not None:
+        metrics, profile_id = bound
+        metrics.record(profile_id, phase, duration, status, **labels)
+
+
+def current_run() -> Metrics | None:
+    bound = current.get()
+    return bound[0] if bound else None
+
+
+def note(
+    key: str,
+    value: Any
+) -> None:
+    # Run-level facts shown in the summary and kept with the run record
+    run = current_run()
+    if run is not None:
+        run.notes[key] = value
@@ -0,0 +1,55 @@
+import asyncio
+import importlib
+from typing import Any, Callable
+from playwright.async_api import BrowserContext, Page
+from src.forgery.automation import SCRIPTS
+from src.forgery.metrics import span
+
+
+def resolve(name: str) -> Callable:
+    if name not in SCRIPTS:
+        # Importing the entry point registers its script
+        importlib.import_module(f"{name}.__main__")
+    return SCRIPTS[name]
+
+
+async def visit(
+    page: Page,
+    url: str
+) -> None:
+    # A page an earlier step already loaded is kept instead of reloaded
+    if not page.url.rstrip("/").startswith(url.rstrip("/")):
+        await page.goto(url)
+
+
+async def run_steps(
+    context: BrowserContext,
+    profile: dict[str, Any],
+    logger,
+    steps: list[dict[str, Any]]
+) -> None:
+    failed: list[str] = []
+    for step in steps:
+        name: str = step["script"]
+        try:
+            if not context.pages:
+                await context.new_page()
+            with span(name):
+                await asyncio.wait_for(
+                    resolve(name)(context, profile, logger),
+                    step.get("timeout")
+                )
+            logger.info(
+                f"{name} done",
+                id=profile["id"]
+            )
+        except Exception as e:
+            failed.append(name)
+            logger.error(
+                f"{name} failed: {str(e) or 'timeout'}!",
+                id=profile["id"]
+            )
+            if step.get("required"):
+                raise
+    if failed:
+        raise RuntimeError(f"Pipeline steps failed: {', '.join(failed)}")
@@ -0,0 +1,38 @@
+from time import time
+from contextvars import ContextVar
+from typing import Any
+
+
+observations: ContextVar[dict[str, Any] | None] = ContextVar(
+    "observations",
+    default=None
+)
+
+
+def bind() -> dict[str, Any]:
+    state: dict[str, Any] = {}
+    observations.set(state)
+    return state
+
+
+def observe(**fields) -> None:
+    # Kept with the profile's journal entry to plan its next launch
+    state = observations.get()
+    if state is not None:
+        state.update(fields, observed=time())
+
+
+def due(
+    state: dict[str, Any] | None,
+    rate: float,
+    min_payoff: float = 1,
+    claim_interval: float | None = None
+) -> float:
+    # Time at which the profile is expected to have min_payoff energy
+    # (rate per hour) or a claim ready, 0 when nothing is known about it
+    if not state or "energy" not in state:
+        return 0.0
+    when = state["observed"] + max(min_payoff - state["energy"], 0) / rate * 3600
+    if claim_interval and state.get("claimed") is not None:
+        when = min(when, state["claimed"] + claim_interval)
+    return when
@@ -0,0 +1,145 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator
+
+
+class ProfileStore(ABC):
+    @abstractmethod
+    def rows(self) -> Iterator[tuple[str, str | None, float]]:
+        ...
+
+    @abstractmethod
+    def tagged(self, tags: Iterable[str]) -> set[str]:
+        ...
+
+    @abstractmethod
+    def load(self, profile_id: str) -> dict[str, Any]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+    def select(
+        self,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        tags: Iterable[str] | None = None,
+        groups: Iterable[str] | None = None
+    ) -> dict[str, float]:
+        # Empty filters select everything, ids keep the store's order
+        included = set(include) if include else None
+        excluded = set(exclude or ())
+        grouped = set(groups) if groups else None
+        tagged = self.tagged(tags) if tags else None
+        return {
+            profile_id: priority
+            for profile_id, group, priority in self.rows()
+            if (
+                (included is None or profile_id in included)
+                and profile_id not in excluded
+                and (grouped is None or group in grouped)
+                and (tagged is None or profile_id in tagged)
+            )
+        }
+
+
+class JsonProfileStore(ProfileStore):
+    def __init__(self, path: str) -> None:
+        with open(path, "r") as f:
+            self.profiles: dict[str, dict[str, Any]] = {
+                profile["id"]: profile
+                for profile in json.load(f)
+            }
+
+    def rows(self) -> Iterator[tuple[str, str | None, float]]:
+        for profile_id, profile in self.profiles.items():
+            yield profile_id, profile.get("group"), profile.get("priority", 0)
+
+    def tagged(self, tags: Iterable[str]) -> set[str]:
+        wanted = set(tags)
+        return {
+            profile_id
+            for profile_id, profile in self.profiles.items()
+            if wanted.intersection(profile.get("tags", ()))
+        }
+
+    def load(self, profile_id: str) -> dict[str, Any]:
+        return self.profiles[profile_id]
+
+
+class SqliteProfileStore(ProfileStore):
+    def __init__(self, path: str) -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                grp TEXT,
+                priority REAL NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tags (
+                id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (tag, id)
+            );
+            """
+        )
+
+    def rows(self) -> Iterator[tuple[str, str | None, float]]:
+        yield from self.connection.execute(
+            "SELECT id, grp, priority FROM profiles ORDER BY rowid"
+        )
+
+    def tagged(self, tags: Iterable[str]) -> set[str]:
+        tags = list(tags)
+        return {
+            profile_id
+            for profile_id, in self.connection.execute(
+                f"SELECT id FROM tags WHERE tag IN ({', '.join('?' * len(tags))})",
+                tags
+            )
+        }
+
+    def load(self, profile_id: str) -> dict[str, Any]:
+        row = self.connection.execute(
+            "SELECT data FROM profiles WHERE id = ?",
+            (profile_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(profile_id)
+        return json.loads(row[0])
+
+    def write(self, profiles: Iterable[dict[str, Any]]) -> int:
+        count = 0
+        with self.connection:
+            for profile in profiles:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO profiles (id, grp, priority, data) VALUES (?, ?, ?, ?)",
+                    (
+                        profile["id"],
+                        profile.get("group"),
+                        profile.get("priority", 0),
+                        json.dumps(profile)
+                    )
+                )
+                self.connection.execute(
+                    "DELETE FROM tags WHERE id = ?",
+                    (profile["id"],)
+                )
+                self.connection.executemany(
+                    "INSERT INTO tags (id, tag) VALUES (?, ?)",
+                    [(profile["id"], tag) for tag in set(profile.get("tags", ()))]
+                )
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_store(path: str) -> ProfileStore:
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteProfileStore(path)
+    return JsonProfileStore(path)
@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Any
+from src.core.utils import logger
+
+
+PROMPTS_DIR: str = ".cache/forgery/prompts"
+
+
+class Prompts(ABC):
+    def __init__(
+        self,
+        timeout: float | None = None
+    ) -> None:
+        self.timeout = timeout
+        self.pending: dict[str, tuple[str, asyncio.Future]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    @abstractmethod
+    async def _serve(self) -> None:
+        ...
+
+    def _announce(
+        self,
+        key: str,
+        question: str
+    ) -> None:
+        logger.info(
+            f"Waiting for input: {question}",
+            id=key
+        )
+
+    def _withdraw(self, key: str) -> None:
+        pass
+
+    def answer(
+        self,
+        key: str,
+        value: str
+    ) -> bool:
+        entry = self.pending.pop(key, None)
+        if entry is None or entry[1].done():
+            return False
+        entry[1].set_result(value)
+        return True
+
+    async def ask(
+        self,
+        key: str,
+        question: str,
+        timeout: float | None = None
+    ) -> str:
+        # The reader is bound to the loop of the first prompt
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._task = loop.create_task(self._serve())
+        future = loop.create_future()
+        self.pending[key] = (question, future)
+        self._announce(key, question)
+        try:
+            return await asyncio.wait_for(
+                future,
+                timeout if timeout is not None else self.timeout
+            )
+        finally:
+            if self.pending.get(key, (None, None))[1] is future:
+                del self.pending[key]
+            self._withdraw(key)
+
+
+class StdinPrompts(Prompts):
+    def __init__(
+        self,
+        timeout: float | None = None
+    ) -> None:
+        super().__init__(timeout)
+        self._reader: threading.Thread | None = None
+
+    def _announce(
+        self,
+        key: str,
+        question: str
+    ) -> None:
+        super()._announce(key, question)
+        if len(self.pending) > 1:
+            logger.info(
+                f"{len(self.pending)} prompts pending, answer with '<id> <value>'"
+            )
+
+    def _read(self) -> None:
+        # A blocking reader thread, as an asyncio pipe would switch the
+        # shared terminal to non-blocking mode for every other reader
+        for line in sys.stdin:
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._line, line.strip())
+            except RuntimeError:
+                pass
+
+    def _line(self, text: str) -> None:
+        if not text or not self.pending:
+            return
+        key, _, value = text.partition(" ")
+        if value and key in self.pending:
+            self.answer(key, value.strip())
+        elif len(self.pending) == 1:
+            self.answer(next(iter(self.pending)), text)
+        else:
+            logger.warning(
+                f"Several prompts pending, prefix the answer with one of: "
+                f"{', '.join(self.pending)}"
+            )
+
+    async def _serve(self) -> None:
+        if self._reader is None:
+            self._reader = threading.Thread(
+                target=self._read,
+                name="stdin-prompts",
+                daemon=True
+            )
+            self._reader.start()
+        await asyncio.Event().wait()
+
+
+class FilePrompts(Prompts):
+    def __init__(
+        self,
+        directory: str = PROMPTS_DIR,
+        interval: float = 1,
+        timeout: float | None = None
+    ) -> None:
+        super().__init__(timeout)
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+
+    def _announce(
+        self,
+        key: str,
+        question: str
+    ) -> None:
+        with open(os.path.join(self.directory, f"{key}.prompt"), "w") as f:
+            f.write(question + "\n")
+        super()._announce(
+            key,
+            f"{question} (write it to {os.path.join(self.directory, key)}.txt)"
+        )
+
+    def _withdraw(self, key: str) -> None:
+        path = os.path.join(self.directory, f"{key}.prompt")
+        if os.path.exists(path):
+            os.remove(path)
+
+    async def _serve(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for key in list(self.pending):
+                path = os.path.join(self.directory, f"{key}.txt")
+                if not os.path.exists(path):
+                    continue
+                with open(path, "r") as f:
+                    value = f.read().strip()
+                os.remove(path)
+                self.answer(key, value)
+
+
+class HttpPrompts(Prompts):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        timeout: float | None = None
+    ) -> None:
+        super().__init__(timeout)
+        self.host = host
+        self.port = port
+
+    def _announce(
+        self,
+        key: str,
+        question: str
+    ) -> None:
+        super()._announce(
+            key,
+            f"{question} (POST it to http://{self.host}:{self.port}/{key})"
+        )
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            method, path, _ = (await reader.readline()).decode().split(" ", 2)
+            length = 0
+            while (header := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = header.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = (await reader.readexactly(length)).decode().strip() if length else ""
+            status, payload = "404 Not Found", {"error": "no such prompt"}
+            if method == "GET":
+                status = "200 OK"
+                payload = {key: question for key, (question, _) in self.pending.items()}
+            elif method == "POST" and self.answer(path.strip("/"), body):
+                status, payload = "200 OK", {"answered": path.strip("/")}
+            content = json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\nConnection: close\r\n\r\n".encode()
+                + content
+            )
+            await writer.drain()
+        except (ValueError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+
+def open_prompts(options: dict[str, Any]) -> Prompts:
+    options = dict(options)
+    source = options.pop("source", "stdin")
+    if source == "file":
+        return FilePrompts(**options)
+    if source == "http":
+        return HttpPrompts(**options)
+    return StdinPrompts(**options)
@@ -0,0 +1,60 @@
+import os
+
+
+PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE")
+
+
+def children() -> dict[int, list[int]]:
+    tree: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, fields resume after ")"
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        tree.setdefault(ppid, []).append(int(entry))
+    return tree
+
+
+def descendants(pid: int) -> list[int]:
+    tree = children()
+    result: list[int] = []
+    stack: list[int] = [pid]
+    while stack:
+        for child in tree.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def tree_rss(pid: int | None = None) -> int:
+    pid = pid or os.getpid()
+    return sum(rss(p) for p in (pid, *descendants(pid)))
+
+
+def memory() -> tuple[int, int]:
+    values: dict[str, int] = {}
+    with open("/proc/meminfo", "r") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            values[key] = int(value.split()[0]) * 1024
+    return values["MemAvailable"], values["MemTotal"]
+
+
+def cpu_times() -> tuple[int, int]:
+    with open("/proc/stat", "r") as f:
+        fields = [int(value) for value in f.readline().split()[1:]]
+    # idle and iowait
+    return fields[3] + fields[4], sum(fields)
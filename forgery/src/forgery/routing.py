@@ -0,0 +1,102 @@
+import re
+from fnmatch import translate
+from urllib.parse import urlsplit
+from typing import Any
+from playwright.async_api import BrowserContext, Request, Route, Error
+from src.core.utils import logger
+
+
+class Rule:
+    def __init__(
+        self,
+        resource_types: list[str] | None = None,
+        urls: list[str] | None = None,
+        domains: list[str] | None = None
+    ) -> None:
+        self.resource_types = set(resource_types or ())
+        self.urls = re.compile(
+            "|".join(translate(url) for url in urls)
+        ) if urls else None
+        self.domains = tuple(domains or ())
+
+    def matches(self, request: Request) -> bool:
+        if request.resource_type in self.resource_types:
+            return True
+        if self.urls and self.urls.match(request.url):
+            return True
+        if self.domains:
+            host = urlsplit(request.url).hostname or ""
+            return any(
+                host == domain or host.endswith("." + domain)
+                for domain in self.domains
+            )
+        return False
+
+
+class Traffic:
+    def __init__(self) -> None:
+        self.allowed: int = 0
+        self.allowed_bytes: int = 0
+        self.blocked: int = 0
+        # Blocked responses are never seen, so only their count is known
+        self.blocked_types: dict[str, int] = {}
+
+    def block(self, request: Request) -> None:
+        self.blocked += 1
+        self.blocked_types[request.resource_type] = (
+            self.blocked_types.get(request.resource_type, 0) + 1
+        )
+
+    def report(self, profile_id: str) -> None:
+        types = ", ".join(
+            f"{resource_type} {count}"
+            for resource_type, count in sorted(
+                self.blocked_types.items(),
+                key=lambda item: item[1],
+                reverse=True
+            )
+        )
+        logger.info(
+            f"Requests: {self.allowed} allowed ({self.allowed_bytes / 2**20:.1f} MiB), "
+            f"{self.blocked} blocked" + (f" ({types})" if types else ""),
+            id=profile_id
+        )
+
+
+class RequestFilter:
+    def __init__(
+        self,
+        block: dict[str, Any] | None = None,
+        allow: dict[str, Any] | None = None
+    ) -> None:
+        self.block = Rule(**(block or {}))
+        self.allow = Rule(**(allow or {}))
+
+    def blocks(self, request: Request) -> bool:
+        return self.block.matches(request) and not self.allow.matches(request)
+
+    async def install(self, context: BrowserContext) -> Traffic:
+        traffic = Traffic()
+
+        async def route(route: Route) -> None:
+            request = route.request
+            try:
+                if self.blocks(request):
+                    traffic.block(request)
+                    await route.abort("blockedbyclient")
+                else:
+                    await route.fallback()
+            except Error:
+                pass
+
+        async def finished(request: Request) -> None:
+            try:
+                size = (await request.sizes())["responseBodySize"]
+            except Error:
+                return
+            traffic.allowed += 1
+            traffic.allowed_bytes += size
+
+        await context.route("**/*", route)
+        context.on("requestfinished", finished)
+        return traffic
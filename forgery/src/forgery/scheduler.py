@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+from itertools import count
+from time import monotonic, time
+from typing import Any, Awaitable, Callable
+from src.core.utils import logger
+from src.forgery.governor import Governor
+
+
+class Scheduler:
+    def __init__(
+        self,
+        workers: int,
+        deadline: float | None = None,
+        governor: Governor | None = None,
+        feed: Callable[[], Awaitable[Any | None]] | None = None
+    ) -> None:
+        self.workers = max(workers, 1)
+        self.deadline = deadline
+        self.governor = governor
+        # Called for more work once the heap is empty, None ends the worker
+        self.feed = feed
+        self.queued: int = 0
+        self.completed: int = 0
+        self.cancelled: int = 0
+        self.busy: list[float] = [0.0] * self.workers
+        self.elapsed: float = 0.0
+        self._heap: list[tuple[float, float, int, Any]] = []
+        self._order = count()
+
+    def put(
+        self,
+        item: Any,
+        priority: float = 0,
+        due: float = 0
+    ) -> None:
+        # Earliest due runs first, then higher priority, then insertion order
+        heapq.heappush(self._heap, (due, -priority, next(self._order), item))
+        self.queued += 1
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def drain(self) -> list[tuple[float, Any]]:
+        items = []
+        while self._heap:
+            due, _, _, item = heapq.heappop(self._heap)
+            items.append((due, item))
+        return items
+
+    async def _next(self) -> Any | None:
+        while self._heap:
+            # Items are not started before they are due
+            delay = self._heap[0][0] - time()
+            if delay <= 0:
+                return heapq.heappop(self._heap)[3]
+            await asyncio.sleep(delay)
+        if self.feed:
+            item = await self.feed()
+            if item is not None:
+                self.queued += 1
+            return item
+        return None
+
+    async def _work(
+        self,
+        worker: int,
+        handler: Callable[[Any], Awaitable[None]]
+    ) -> None:
+        while self._heap or self.feed:
+            if self.governor:
+                await self.governor.acquire()
+            item = await self._next()
+            if item is None:
+                if self.governor:
+                    await self.governor.release()
+                break
+            started = monotonic()
+            try:
+                await handler(item)
+                self.completed += 1
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                self.busy[worker] += monotonic() - started
+                if self.governor:
+                    await self.governor.release()
+
+    async def run(
+        self,
+        handler: Callable[[Any], Awaitable[None]]
+    ) -> None:
+        started = monotonic()
+        tasks = [
+            asyncio.create_task(self._work(worker, handler))
+            for worker in range(self.workers)
+        ]
+        governing: asyncio.Task | None = None
+        if self.governor:
+            governing = asyncio.create_task(self.governor.run())
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            if pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                logger.warning(
+                    f"Run deadline of {self.deadline}s reached, "
+                    f"{self.cancelled} profiles interrupted, {self.depth} left in queue"
+                )
+            for task in tasks:
+                if not task.cancelled() and task.exception():
+                    raise task.exception()
+        finally:
+            if governing:
+                governing.cancel()
+            self.elapsed = monotonic() - started
+
+    def utilization(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return sum(self.busy) / (self.workers * self.elapsed)
+
+    def report(self) -> None:
+        logger.info(
+            f"Queue: {self.queued} queued, {self.completed} completed, "
+            f"{self.cancelled} interrupted, {self.depth} left"
+        )
+        logger.info(
+            f"Workers: {self.workers} in {self.elapsed:.1f}s, "
+            f"utilization {self.utilization():.0%} ("
+            + ", ".join(f"{busy / self.elapsed:.0%}" for busy in self.busy if self.elapsed)
+            + ")"
+        )
@@ -0,0 +1,178 @@
+import sys
+import queue
+import asyncio
+import importlib
+import multiprocessing
+from time import time
+from typing import Any, Callable, Iterable
+from src.core.utils import logger
+
+
+class Shard:
+    def __init__(
+        self,
+        index: int,
+        tasks: multiprocessing.Queue,
+        results: multiprocessing.Queue
+    ) -> None:
+        self.index = index
+        self.tasks = tasks
+        self.results = results
+
+    async def next(self) -> Any | None:
+        # Short blocking gets so a cancelled worker frees its thread quickly
+        while True:
+            try:
+                item = await asyncio.to_thread(self.tasks.get, True, 1)
+            except queue.Empty:
+                continue
+            if item is not None:
+                self.send("started", item)
+            return item
+
+    def send(
+        self,
+        kind: str,
+        *payload
+    ) -> None:
+        self.results.put((kind, self.index, *payload))
+
+    def forward(self, message) -> None:
+        record = message.record
+        self.send(
+            "log",
+            record["level"].name,
+            record["message"],
+            dict(record["extra"])
+        )
+
+
+def locate(target: Callable) -> tuple[str, str]:
+    # Entry points run as `python -m` live in __main__, which spawned
+    # children do not re-import, so they import the module by name instead
+    module: str = target.__module__
+    if module == "__main__":
+        spec = sys.modules["__main__"].__spec__
+        if spec is None:
+            raise RuntimeError("Sharded scripts must be started with python -m")
+        module = spec.name
+    return module, target.__qualname__
+
+
+def _main(
+    target: tuple[str, str],
+    shard: Shard
+) -> None:
+    # Records go to the parent, which owns every sink
+    logger.remove()
+    logger.add(shard.forward, format="{message}")
+    try:
+        module, name = target
+        runner = getattr(importlib.import_module(module), name)
+        asyncio.run(runner(shard=shard))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Shard {shard.index} failed: {e}!")
+        shard.send("crashed")
+    finally:
+        shard.send("done")
+
+
+class ShardPool:
+    def __init__(
+        self,
+        processes: int,
+        grace: float = 30
+    ) -> None:
+        self.processes = processes
+        self.grace = grace
+        self._context = multiprocessing.get_context("spawn")
+
+    async def run(
+        self,
+        target: Callable,
+        items: list[tuple[float, Any]],
+        workers: int,
+        handle: Callable[[str, int, list[Any]], None]
+    ) -> None:
+        tasks = self._context.Queue()
+        results = self._context.Queue()
+
+        async def hand_out() -> None:
+            # Items are ordered by due time and only handed out once due
+            for due, item in items:
+                if due > time():
+                    await asyncio.sleep(due - time())
+                tasks.put(item)
+            # One end marker per worker of every shard
+            for _ in range(self.processes * workers):
+                tasks.put(None)
+
+        shards = [
+            self._context.Process(
+                target=_main,
+                args=(locate(target), Shard(index, tasks, results)),
+                name=f"shard-{index}"
+            )
+            for index in range(self.processes)
+        ]
+        for shard in shards:
+            shard.start()
+        logger.info(
+            f"Sharding {len(items)} profiles across {self.processes} processes"
+        )
+        running: set[int] = set(range(self.processes))
+        started: set[Any] = set()
+        in_flight: dict[int, set[Any]] = {index: set() for index in running}
+        crashed: bool = False
+
+        def lost(index: int, items: Iterable[Any]) -> None:
+            # Profiles a dead shard took or left behind still get an outcome
+            for item in items:
+                handle("result", index, [item, "failure", "shard", {}])
+
+        feeding = asyncio.create_task(hand_out())
+        try:
+            while running:
+                try:
+                    kind, index, *payload = await asyncio.to_thread(results.get, True, 1)
+                except queue.Empty:
+                    for index in list(running):
+                        if shards[index].exitcode not in (None, 0):
+                            running.discard(index)
+                            crashed = True
+                            logger.error(
+                                f"Shard {index} exited with code {shards[index].exitcode}, "
+                                f"{len(in_flight[index])} profiles lost!"
+                            )
+                            lost(index, in_flight.pop(index))
+                    continue
+                if kind == "crashed":
+                    crashed = True
+                elif kind == "done":
+                    running.discard(index)
+                    lost(index, in_flight.pop(index, ()))
+                elif kind == "log":
+                    level, message, extra = payload
+                    logger.bind(**extra).log(level, message)
+                elif kind == "started":
+                    started.add(payload[0])
+                    in_flight.setdefault(index, set()).add(payload[0])
+                else:
+                    if kind == "result":
+                        in_flight.get(index, set()).discard(payload[0])
+                    handle(kind, index, payload)
+            if crashed and not feeding.done():
+                feeding.cancel()
+            if crashed:
+                unstarted = [item for _, item in items if item not in started]
+                if unstarted:
+                    logger.error(f"{len(unstarted)} profiles were not run after a shard crash!")
+                    lost(-1, unstarted)
+        finally:
+            feeding.cancel()
+            for shard in shards:
+                await asyncio.to_thread(shard.join, self.grace)
+                if shard.is_alive():
+                    shard.terminate()
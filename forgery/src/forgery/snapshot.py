@@ -0,0 +1,93 @@
+from typing import Any
+from playwright.async_api import Page, Frame, Locator
+
+
+# Resolves css, "xpath=" and "text=" selectors ("text=\"...\"" for an exact
+# match) and reads every element in a single round-trip
+SNAPSHOT_JS: str = """
+([selectors, attributes]) => {
+    const find = (selector) => {
+        if (selector.startsWith("xpath=")) {
+            const result = document.evaluate(
+                selector.slice(6), document, null,
+                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+            );
+            return Array.from(
+                {length: result.snapshotLength},
+                (_, i) => result.snapshotItem(i)
+            );
+        }
+        if (selector.startsWith("text=")) {
+            let wanted = selector.slice(5);
+            const exact = wanted.length > 1 && wanted.startsWith('"') && wanted.endsWith('"');
+            wanted = exact ? wanted.slice(1, -1) : wanted.toLowerCase();
+            const matches = (element) => {
+                const text = (element.innerText || "").trim();
+                return exact ? text === wanted : text.toLowerCase().includes(wanted);
+            };
+            // Innermost elements only, like Playwright's text selectors
+            return Array.from(document.querySelectorAll("body *")).filter(
+                (element) => matches(element)
+                    && !Array.from(element.children).some(matches)
+            );
+        }
+        return Array.from(document.querySelectorAll(selector));
+    };
+    const state = {};
+    for (const [name, selector] of Object.entries(selectors)) {
+        const elements = find(selector);
+        const element = elements[0];
+        state[name] = {
+            count: elements.length,
+            visible: !!element
+                && element.getClientRects().length > 0
+                && getComputedStyle(element).visibility !== "hidden",
+            enabled: !!element
+                && !element.disabled
+                && element.getAttribute("aria-disabled") !== "true",
+            text: element ? (element.innerText ?? element.textContent) : null,
+            attributes: element
+                ? Object.fromEntries(attributes.map((name) => [name, element.getAttribute(name)]))
+                : {}
+        };
+    }
+    return state;
+}
+"""
+
+
+class Element:
+    def __init__(
+        self,
+        count: int,
+        visible: bool,
+        enabled: bool,
+        text: str | None,
+        attributes: dict[str, str | None]
+    ) -> None:
+        self.count = count
+        self.visible = visible
+        self.enabled = enabled
+        self.text = text
+        self.attributes = attributes
+
+    @property
+    def present(self) -> bool:
+        return self.count > 0
+
+
+async def snapshot(
+    root: Page | Frame | Locator,
+    selectors: dict[str, str],
+    attributes: tuple[str, ...] = ()
+) -> dict[str, Element]:
+    # A locator (e.g. frame_locator.locator(":root")) evaluates in its frame
+    arg: list[Any] = [selectors, list(attributes)]
+    if isinstance(root, Locator):
+        state = await root.evaluate(f"(_, arg) => ({SNAPSHOT_JS})(arg)", arg)
+    else:
+        state = await root.evaluate(SNAPSHOT_JS, arg)
+    return {
+        name: Element(**values)
+        for name, values in state.items()
+    }
@@ -0,0 +1,163 @@
+import os
+import json
+import signal
+import asyncio
+import importlib
+from glob import glob
+from types import ModuleType
+from typing import Any
+from playwright.async_api import Playwright, async_playwright
+from src.core.utils import logger, add_sink
+
+
+PID_FILE: str = ".cache/forgery/supervisor.pid"
+
+
+class Supervisor:
+    def __init__(
+        self,
+        config: str,
+        pid_file: str = PID_FILE
+    ) -> None:
+        self.config = config
+        self.pid_file = pid_file
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.poll: float = 5
+        self._modules: dict[str, ModuleType] = {}
+        self._stamps: dict[str, dict[str, float]] = {}
+        self._loops: dict[str, asyncio.Task] = {}
+        self._config_stamp: float | None = None
+        self.log_options: dict[str, Any] = {}
+        self._sink: int | None = None
+        self._stopping = asyncio.Event()
+
+    @staticmethod
+    def _stamp(paths: list[str]) -> dict[str, float]:
+        stamp: dict[str, float] = {}
+        for path in paths:
+            try:
+                stamp[path] = os.stat(path).st_mtime
+            except FileNotFoundError:
+                pass
+        return stamp
+
+    def _read_config(self) -> None:
+        with open(self.config, "r") as f:
+            config_obj: dict[str, Any] = json.load(f)
+        self.poll = config_obj.get("poll", 5)
+        log_options: dict[str, Any] = config_obj.get("logging", {})
+        if log_options != self.log_options:
+            if self._sink is not None:
+                logger.remove(self._sink)
+                self._sink = None
+            if log_options.get("file"):
+                self._sink = add_sink(log_options["file"], log_options)
+            self.log_options = log_options
+        self.entries = {
+            entry["module"]: entry
+            for entry in config_obj.get("scripts", [])
+            if entry.get("enabled", True)
+        }
+
+    def _module(self, name: str) -> ModuleType:
+        # Scripts read their config.json at import time, so a changed
+        # config is picked up by re-importing the script module
+        module_name = f"{name}.__main__"
+        directory = os.path.join(*name.split("."))
+        stamp = self._stamp(glob(os.path.join(directory, "*.json")))
+        module = self._modules.get(name)
+        if module is None:
+            module = importlib.import_module(module_name)
+        elif stamp != self._stamps.get(name):
+            module = importlib.reload(module)
+            logger.info(f"{name} reloaded")
+        self._modules[name] = module
+        self._stamps[name] = stamp
+        return module
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except TimeoutError:
+            pass
+
+    async def _loop(
+        self,
+        name: str,
+        playwright: Playwright
+    ) -> None:
+        while not self._stopping.is_set() and name in self.entries:
+            try:
+                module = self._module(name)
+                logger.info(f"{name} started")
+                await module.script(playwright=playwright)
+                logger.info(f"{name} finished")
+            except Exception as e:
+                logger.error(f"{name} failed: {e}!")
+            entry = self.entries.get(name)
+            if entry is None:
+                break
+            await self._sleep(entry.get("interval", 0))
+
+    def _sync(self, playwright: Playwright) -> None:
+        for name in self.entries:
+            loop = self._loops.get(name)
+            if loop is None or loop.done():
+                self._loops[name] = asyncio.create_task(
+                    self._loop(name, playwright)
+                )
+        # Loops of removed entries exit on their own after the current run
+
+    def drain(self) -> None:
+        if self._stopping.is_set():
+            logger.warning("Stopping now")
+            for loop in self._loops.values():
+                loop.cancel()
+            return
+        logger.info("Draining, running scripts will finish first")
+        self._stopping.set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.drain)
+        os.makedirs(os.path.dirname(self.pid_file), exist_ok=True)
+        with open(self.pid_file, "w") as f:
+            f.write(str(os.getpid()))
+        try:
+            async with async_playwright() as playwright:
+                logger.info("Supervisor started")
+                while not self._stopping.is_set():
+                    stamp = os.stat(self.config).st_mtime
+                    if stamp != self._config_stamp:
+                        try:
+                            self._read_config()
+                        except (json.JSONDecodeError, KeyError) as e:
+                            logger.error(f"{self.config} not reloaded: {e}!")
+                        else:
+                            if self._config_stamp is not None:
+                                logger.info(f"{self.config} reloaded")
+                        self._config_stamp = stamp
+                    self._sync(playwright)
+                    await self._sleep(self.poll)
+                await asyncio.gather(
+                    *self._loops.values(),
+                    return_exceptions=True
+                )
+        finally:
+            os.remove(self.pid_file)
+            logger.info("Supervisor stopped")
+
+
+def stop(pid_file: str = PID_FILE) -> bool:
+    try:
+        with open(pid_file, "r") as f:
+            pid = int(f.read())
+    except FileNotFoundError:
+        return False
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        os.remove(pid_file)
+        return False
+    return True
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import asyncio
+from time import perf_counter
+from functools import wraps, lru_cache
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Awaitable, Callable
+from playwright.async_api import Page, Frame, Locator, Keyboard, Mouse
+from src.core.utils import logger
+from src.forgery import waiting
+from src.forgery.metrics import Metrics, record, percentile
+
+
+TRACES_DIR: str = ".cache/forgery/traces"
+ACTIONS: dict[type, tuple[str, ...]] = {
+    Page: (
+        "goto",
+        "reload",
+        "go_back",
+        "wait_for_load_state",
+        "wait_for_url",
+        "wait_for_selector",
+        "wait_for_function",
+        "wait_for_timeout",
+        "evaluate",
+        "screenshot"
+    ),
+    Frame: (
+        "goto",
+        "wait_for_load_state",
+        "wait_for_url",
+        "wait_for_selector",
+        "evaluate"
+    ),
+    Locator: (
+        "click",
+        "dblclick",
+        "tap",
+        "fill",
+        "press",
+        "press_sequentially",
+        "type",
+        "check",
+        "hover",
+        "select_option",
+        "set_input_files",
+        "scroll_into_view_if_needed",
+        "wait_for",
+        "count",
+        "is_visible",
+        "inner_text",
+        "inner_html",
+        "text_content",
+        "input_value",
+        "get_attribute",
+        "all_inner_texts",
+        "bounding_box",
+        "evaluate",
+        "screenshot"
+    ),
+    Keyboard: (
+        "press",
+        "type"
+    ),
+    Mouse: (
+        "click",
+        "move",
+        "wheel"
+    )
+}
+enabled: ContextVar[bool] = ContextVar(
+    "tracing",
+    default=False
+)
+_installed: bool = False
+# Frames between the script and an action that only pass it along
+_PASSTHROUGH: tuple[str, ...] = (
+    os.path.dirname(asyncio.__file__) + os.sep,
+    waiting.__file__
+)
+
+
+@lru_cache(maxsize=None)
+def _location(filename: str) -> str:
+    return os.path.relpath(filename)
+
+
+def _caller() -> FrameType:
+    # Taken when the action is called, a task started by waiting.first()
+    # would otherwise only show the event loop as its caller
+    frame = sys._getframe(2)
+    while (
+        frame.f_back is not None
+        and frame.f_code.co_filename.startswith(_PASSTHROUGH)
+    ):
+        frame = frame.f_back
+    return frame
+
+
+async def _timed(
+    step: str,
+    action: Awaitable[Any]
+) -> Any:
+    started = perf_counter()
+    status = "success"
+    try:
+        return await action
+    except BaseException:
+        status = "failure"
+        raise
+    finally:
+        record(
+            "step",
+            perf_counter() - started,
+            status,
+            step=step
+        )
+
+
+def _traced(
+    name: str,
+    method: Callable
+) -> Callable:
+    @wraps(method)
+    def traced(self, *args, **kwargs):
+        if not enabled.get():
+            return method(self, *args, **kwargs)
+        caller = _caller()
+        return _timed(
+            f"{name} {_location(caller.f_code.co_filename)}:{caller.f_lineno}",
+            method(self, *args, **kwargs)
+        )
+
+    return traced
+
+
+def install() -> None:
+    # Patched once per process, steps are only timed where tracing is enabled
+    global _installed
+    if _installed:
+        return
+    for cls, names in ACTIONS.items():
+        for name in names:
+            setattr(
+                cls,
+                name,
+                _traced(f"{cls.__name__}.{name}", getattr(cls, name))
+            )
+    _installed = True
+
+
+def steps(metrics: Metrics) -> dict[str, dict[str, Any]]:
+    durations: dict[str, list[float]] = {}
+    failures: dict[str, int] = {}
+    profiles: dict[str, set[str]] = {}
+    for entry in metrics.records:
+        if entry["phase"] != "step":
+            continue
+        durations.setdefault(entry["step"], []).append(entry["duration"])
+        profiles.setdefault(entry["step"], set()).add(entry["id"])
+        if entry["status"] != "success":
+            failures[entry["step"]] = failures.get(entry["step"], 0) + 1
+    return {
+        step: {
+            "count": len(values),
+            "profiles": len(profiles[step]),
+            "failures": failures.get(step, 0),
+            "total": sum(values),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "max": max(values)
+        }
+        for step, values in sorted(
+            durations.items(),
+            key=lambda item: sum(item[1]),
+            reverse=True
+        )
+    }
+
+
+def report(
+    metrics: Metrics,
+    directory: str,
+    top: int = 15
+) -> None:
+    aggregated = steps(metrics)
+    if not aggregated:
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{metrics.name}.steps.json"), "w") as f:
+        json.dump(aggregated, f, indent=4)
+    logger.info(f"Slowest of {len(aggregated)} steps by total time:")
+    for step, stats in list(aggregated.items())[:top]:
+        logger.info(
+            f"{step} ({stats['count']} in {stats['profiles']} profiles, "
+            f"{stats['failures']} failed): total {stats['total']:.1f}s, "
+            f"p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s, max {stats['max']:.2f}s"
+        )
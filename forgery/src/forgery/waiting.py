@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Literal
+from playwright.async_api import Locator, Error
+
+
+State = Literal["attached", "detached", "visible", "hidden"]
+
+
+async def first(
+    conditions: dict[str, Locator | Callable[[], Awaitable[Any]]],
+    timeout: float | None = None,
+    state: State = "visible"
+) -> str | None:
+    # Timeouts are in milliseconds like the rest of Playwright, None waits forever
+    def wait(condition: Locator | Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        if isinstance(condition, Locator):
+            # Bound the driver-side wait too, so losers do not linger there
+            return condition.wait_for(state=state, timeout=timeout or 0)
+        return condition()
+
+    tasks: dict[asyncio.Task, str] = {
+        asyncio.ensure_future(wait(condition)): key
+        for key, condition in conditions.items()
+    }
+    pending = set(tasks)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout / 1000
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if deadline is None else max(deadline - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                return None
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    return tasks[task]
+                if isinstance(task.exception(), (Error, TimeoutError)):
+                    # A condition that can no longer resolve just drops out
+                    continue
+                raise task.exception()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
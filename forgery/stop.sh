@@ -1,4 +1,3 @@
 #!/bin/bash
 
-killall background.sh
-pkill -15 -f ".*python -m scripts.*"
+poetry run python -m src.forgery stop